@@ -0,0 +1,265 @@
+# DamEdit benchmarks: generated corpora through the highlighter, find and the open paths, and with --tk through
+# the editor itself (highlight passes, gutter, find next, open-to-fully-highlighted)
+#
+#   python bench.py                         headless cases
+#   xvfb-run -a python bench.py --tk        Tk-backed cases as well; any display works, Xvfb keeps it off screen
+#   python bench.py --save base.json        record the results as a baseline
+#   python bench.py --baseline base.json    compare against one; exits 1 when a case regressed
+import os, gc, sys, json, math, time, random, shutil, argparse, platform, tempfile, tracemalloc
+import main
+
+SIZES = (1_000, 10_000, 100_000)    # lines per generated python/js corpus
+QUICK_SIZES = (1_000, 10_000)
+LONG_LINE = 1_000_000               # characters of the single-line (minified) js corpus
+GIANT_STRING = 1_000_000            # characters inside one python string literal
+REPEAT = 5
+TOLERANCE = 0.20                    # a p50 this much slower than the baseline is a regression...
+NOISE_MS = 1.0                      # ...unless it moved by less than this
+SETTLE_TIMEOUT = 120.0              # seconds a Tk open may take to finish highlighting
+
+# corpora
+PY_BLOCKS = (
+    "import os, sys\nfrom collections import OrderedDict as OD{n}\n",
+    "class Node{n}(object):\n    \"\"\"A node.\n\n    Spans lines.\"\"\"\n    def __init__(self, a, b={n}):\n"
+    "        self.a = a\n        self.b = [b, 'x', \"y\"]  # trailing comment\n",
+    "def func{n}(x, *args, **kw):\n    if x > {n} and not kw:\n        return f\"{{x}}-{n}\"\n"
+    "    for i in range(len(args)):\n        x += args[i] * 0x{n:x}\n    return x\n",
+    "value{n} = func{n}(len(sys.argv), 'a', \"b\") if os.sep == '/' else None\n",
+    "try:\n    data{n} = {{'k': [1, 2.5, None], \"n\": ({n},)}}\nexcept (KeyError, ValueError) as ex:\n    raise\n",
+    "# a comment with 'quotes' and \"more\" of them {n}\n\n",
+)
+JS_BLOCKS = (
+    "import {{ a{n}, b }} from \"mod{n}\";\n",
+    "const value{n} = function (x, y) {{\n  // comment {n}\n  return x + y * {n};\n}};\n",
+    "class Widget{n} extends Base {{\n  constructor(el) {{\n    super(el);\n    this.name = 'w{n}';\n  }}\n}}\n",
+    "/* block\n   comment {n} */\nlet s{n} = `template ${{value{n}}}` + \"str\" + 'str';\n",
+    "if (x{n} === null || y !== undefined) {{ throw new Error(\"bad {n}\"); }}\n\n",
+)
+
+def corpus(blocks, lines, seed=0):
+    rnd = random.Random(seed)
+    out, n = [], 0
+    while n < lines:
+        blk = rnd.choice(blocks).format(n=len(out))
+        out.append(blk); n += blk.count("\n")
+    return "".join(out)
+
+def long_line_corpus(chars):
+    unit = "var a=1,b=\"s\";function f(x){return x+b}/*c*/if(a){f(a)}else{b='t'};"
+    return unit * (chars // len(unit)) + "\n"
+
+def giant_string_corpus(chars):
+    body = "lorem 'ipsum' # not a comment \\\" dolor\n"
+    return 'DATA = """' + body * (chars // len(body)) + '"""\n\ndef after(x):\n    return DATA[x]\n'
+
+def load_config(name):
+    with open(os.path.join(main.CONFIG_DIR, name), "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+# measuring
+def percentile(times, p):
+    return times[min(len(times) - 1, max(0, math.ceil(p / 100 * len(times)) - 1))]
+
+class Bench:
+    def __init__(self, repeat, memory=True, pattern=None):
+        self.repeat = repeat
+        self.memory = memory
+        self.pattern = pattern
+        self.results = {}
+
+    def run(self, name, fn, setup=None, repeat=None):
+        # setup() runs untimed before each call and its result is passed to fn. the first call only warms up;
+        # peak memory comes from one more call under tracemalloc, which would skew the timings
+        if self.pattern and self.pattern not in name: return
+        times = []
+        for i in range((repeat or self.repeat) + 1):
+            arg = setup() if setup else None
+            gc.collect()
+            t0 = time.perf_counter()
+            fn(arg) if setup else fn()
+            if i: times.append(time.perf_counter() - t0)
+        peak = None
+        if self.memory:
+            arg = setup() if setup else None
+            gc.collect()
+            tracemalloc.start()
+            fn(arg) if setup else fn()
+            peak = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+        times.sort()
+        res = self.results[name] = {"p50_ms": percentile(times, 50) * 1000, "p95_ms": percentile(times, 95) * 1000,
+                                    "ops_per_s": len(times) / sum(times) if sum(times) else float("inf"),
+                                    "peak_kb": peak, "runs": len(times)}
+        print(f"{name:<36} {res['p50_ms']:>10.2f} {res['p95_ms']:>10.2f} {res['ops_per_s']:>10.1f} "
+              f"{'-' if peak is None else peak:>10}", flush=True)
+
+# headless cases
+def headless_cases(b, corpora, files, tmp, sizes):
+    hl = {"py": main.Highlighter(main.PYTHON_CONFIG), "js": main.Highlighter(load_config("js_config.json"))}
+    for name, (kind, txt) in corpora.items():
+        b.run(f"spans.{name}", lambda: hl[kind].spans(txt))
+        b.run(f"compute.{name}", lambda: hl[kind].compute(txt))
+    for name, (kind, txt) in corpora.items():
+        if not name[-1].isdigit(): continue
+        b.run(f"find.index.{name}", lambda: main.FindIndex("value").update(txt))
+        b.run(f"find.regex.{name}", lambda: main.FindIndex(r"\bdef \w+|\bfunction\b", regex=True).update(txt))
+        idx = main.FindIndex("value"); idx.update(txt)
+        rnd = random.Random(1)
+        steps = [rnd.randrange(len(txt)) for _ in range(1000)]
+        b.run(f"find.next.x1000.{name}", lambda: [idx.next(off) for off in steps])
+    for name, path in files.items():
+        b.run(f"open.read.{name}", lambda: open(path, "r", encoding="utf-8").read())
+        b.run(f"open.stream.{name}", lambda: drain_reader(main.FileReader(path)))
+        b.run(f"open.lineindex.{name}", lambda: wait_index(main.LineIndex(path)))
+    cache = main.SpanCache(os.path.join(tmp, "spans"))
+    for name, (kind, txt) in corpora.items():
+        if name != f"{kind}.{max(sizes)}": continue
+        res = hl[kind].compute(txt)
+        src = (name, 0, len(txt))
+        b.run(f"spancache.store.{name}", lambda: cache.store(src, hl[kind].config, res["rows"], res.get("sync"), res.get("regex")))
+        b.run(f"spancache.load.{name}", lambda: cache.load(src, hl[kind].config, len(res["lines"])))
+
+def drain_reader(reader):
+    while True:
+        item = reader.chunks.get()
+        if item is None: return
+        if isinstance(item, Exception): raise item
+
+def wait_index(index):
+    while not index.complete: time.sleep(0.001)
+    index.close()
+
+# Tk cases
+def tk_cases(b, corpora, files, tmp):
+    main.SESSION_FILE = os.path.join(tmp, "session.json")   # neither restore nor overwrite the user's session
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))    # the editor finds assets/ and its configs from here
+    ed = main.ConfigEditor()
+    ed.span_cache = main.SpanCache(os.path.join(tmp, "tkspans"))
+    ed.update()
+    cfg = {"py": main.PYTHON_CONFIG, "js": load_config("js_config.json")}
+
+    def fill(kind, txt):
+        ed.load_language_config(cfg[kind])
+        ed.text_area.delete("1.0", "end")
+        ed.text_area.insert("1.0", txt)
+        ed.text_area.edit_modified(False)
+        ed._hl_rows = ed._hl_rows_lines = ed._hl_lines = None
+        ed._align_rows(txt.split("\n"))
+        ed.update()
+
+    for name, (kind, txt) in corpora.items():
+        if not name[-1].isdigit(): continue
+        if kind == "py":
+            b.run(f"tk.tokenize_apply.{name}", lambda _: (ed._tokenize_and_apply_structures(txt), ed.update_idletasks()),
+                  setup=lambda: fill(kind, txt))
+        else:
+            ed.background_highlight = False
+            b.run(f"tk.highlight_regex.{name}", lambda _: (ed._highlight_and_number(), ed.update_idletasks()),
+                  setup=lambda: fill(kind, txt))
+            ed.background_highlight = True
+        rnd = random.Random(2)
+        def scrolled():
+            ed.text_area.yview("moveto", rnd.random())
+            ed.update_idletasks()
+            ed._ln_drawn = None
+        b.run(f"tk.gutter.{name}", lambda _: ed._update_line_numbers(), setup=scrolled)
+        ed._open_find()
+        ed.find_entry.delete(0, "end"); ed.find_entry.insert(0, "value")
+        ed._find = None
+        b.run(f"tk.find_next.{name}", lambda: (ed._find_next(), ed.update_idletasks()), repeat=max(b.repeat, 20))
+        ed._close_find()
+
+    def fresh(clear_cache=True):
+        for d in list(ed.docs):
+            d.dirty = False
+            ed._close_tab(d)
+        if clear_cache: shutil.rmtree(ed.span_cache.folder, ignore_errors=True)
+        ed.update()
+    def load(path):
+        ed._load_path(path)
+        settle(ed)
+    for name, path in files.items():
+        b.run(f"tk.load_path.{name}", lambda _: load(path), setup=fresh)
+        if main.SpanCache.source(path) is None: continue
+        # the span cache is written off the Tk thread once a pass finishes; wait for the entry before timing reopens
+        fresh(); load(path)
+        wait_cached(ed.span_cache.folder)
+        b.run(f"tk.load_path.cached.{name}", lambda _: load(path), setup=lambda: fresh(False))
+    ed.destroy()
+
+def wait_cached(folder):
+    deadline = time.perf_counter() + SETTLE_TIMEOUT
+    while time.perf_counter() < deadline:
+        if os.path.isdir(folder) and any(n.endswith(".spans") for n in os.listdir(folder)): return
+        time.sleep(0.01)
+
+def settle(ed):
+    # pump the event loop until the open and every highlight pass it started have finished
+    deadline = time.perf_counter() + SETTLE_TIMEOUT
+    while ed._stream or ed._lazy or ed._hl_pending is not None or ed._hl_apply or ed._highlight_job:
+        if time.perf_counter() > deadline: raise TimeoutError("editor did not settle")
+        ed.update()
+        time.sleep(0.0005)
+    ed.update_idletasks()
+
+# baseline
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'case':<36} {'base p50':>10} {'p50':>10} {'ratio':>7}")
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base: continue
+        ratio = res["p50_ms"] / base["p50_ms"] if base["p50_ms"] else float("inf")
+        bad = ratio > 1 + tolerance and res["p50_ms"] - base["p50_ms"] > NOISE_MS
+        if bad: regressions.append(name)
+        print(f"{name:<36} {base['p50_ms']:>10.2f} {res['p50_ms']:>10.2f} {ratio:>6.2f}x{'  REGRESSION' if bad else ''}")
+    print(f"\n{len(regressions)} regression(s)" + (": " + ", ".join(regressions) if regressions else ""))
+    return regressions
+
+def main_bench(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark DamEdit's hot paths.")
+    ap.add_argument("--tk", action="store_true", help="also run the cases that need a Tk display")
+    ap.add_argument("--quick", action="store_true", help=f"corpora of {', '.join(map(str, QUICK_SIZES))} lines only")
+    ap.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per case (default: %(default)s)")
+    ap.add_argument("--filter", help="only run cases whose name contains this")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each case")
+    ap.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    ap.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed p50 slowdown (default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    corpora = {}
+    for n in sizes:
+        corpora[f"py.{n}"] = ("py", corpus(PY_BLOCKS, n))
+        corpora[f"js.{n}"] = ("js", corpus(JS_BLOCKS, n))
+    corpora["js.longline"] = ("js", long_line_corpus(LONG_LINE))
+    corpora["py.giantstring"] = ("py", giant_string_corpus(GIANT_STRING))
+
+    tmp = tempfile.mkdtemp(prefix="damedit-bench-")
+    files = {}
+    for name, (kind, txt) in corpora.items():
+        files[name] = os.path.join(tmp, f"{name.replace('.', '_')}.{kind}")
+        with open(files[name], "w", encoding="utf-8") as fh:
+            fh.write(txt)
+
+    b = Bench(args.repeat, not args.no_memory, args.filter)
+    print(f"{'case':<36} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'peak KiB':>10}")
+    try:
+        headless_cases(b, corpora, files, tmp, sizes)
+        if args.tk: tk_cases(b, corpora, files, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"python": sys.version.split()[0], "platform": platform.platform(), "results": b.results}, fh, indent=1)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if compare(b.results, baseline, args.tolerance): return 1
+    return 0
+
+if __name__ == "__main__":
+
+    sys.exit(main_bench())
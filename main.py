@@ -1,7 +1,13 @@
 
-import os, io, re, json, tokenize, tkinter as tk
+import time
+_STARTED = time.perf_counter()  # start of this module's import, for the startup report
+# html, tempfile, argparse and concurrent.futures are imported where they are used, off the startup path
+import os, io, re, sys, json, mmap, codecs, bisect, queue, shutil, fnmatch, hashlib, threading, tokenize, tkinter as tk
+from array import array
+from collections import OrderedDict
 from tkinter import ttk, filedialog, messagebox
 import tkinter.font as tkfont
+_IMPORTED = time.perf_counter()
 
 # Default theme
 DEFAULT_THEME = {
@@ -36,62 +42,1382 @@ DEFAULT_THEME = {
 }
 
 # Config Files
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config")
+
 class ConfigManager:
-    def __init__(self, folder="configs"):
+    # the language configs of a folder. a scan only records each file's name and extensions, in an index that is
+    # kept on disk (when index_dir is given) keyed by mtime and size, so files that did not change are not parsed
+    # again; a config is read in full the first time a file needs it
+    INDEX_VERSION = 1
+
+    def __init__(self, folder=CONFIG_DIR, index_dir=None, scan=True):
         self.folder = folder
-        self.available = []
-        self.ext_map = {}
-        self.scan()
+        self.index_file = None
+        if index_dir:
+            tag = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:16]
+            self.index_file = os.path.join(index_dir, f"configs-{tag}.json")
+        self.available = []     # index entries of the usable configs: file, mtime_ns, size, name, extensions
+        self.ext_map = {}       # extension -> index entry
+        self.loaded = {}        # file -> (mtime_ns, size, config)
+        self.parsed = 0         # config files json-parsed so far
+        self._index = None      # file -> index entry, usable or not, as of the last scan
+        if scan: self.scan()
+
+    @staticmethod
+    def normalize(cfg):
+        # cfg with its extensions lower-cased and dotted, or None when it is not a config
+        if not isinstance(cfg, dict): return None
+        norm = []
+        for e in cfg.get("extensions", []) or cfg.get("ext", []):
+            if not isinstance(e, str): continue
+            if not e.startswith("."): e = "." + e
+            norm.append(e.lower())
+        cfg["extensions"] = norm
+        return cfg
+
+    def _read(self, fn):
+        with open(os.path.join(self.folder, fn), "r", encoding="utf-8") as fh:
+            cfg = json.load(fh)
+        self.parsed += 1
+        return self.normalize(cfg)
+
+    def _read_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as fh:
+                idx = json.load(fh)
+            if idx["version"] == self.INDEX_VERSION:
+                return {e["file"]: e for e in idx["files"]}
+        except (OSError, ValueError, LookupError, TypeError):
+            pass
+        return {}
 
     def scan(self):
-        self.available.clear()
+        old = self._index
+        if old is None: old = self._read_index() if self.index_file else {}
+        self.available = []
         self.ext_map.clear()
-        if not os.path.isdir(self.folder):
-            return
-        for fn in sorted(os.listdir(self.folder)):
+        index = {}
+        names = sorted(os.listdir(self.folder)) if os.path.isdir(self.folder) else []
+        for fn in names:
             if not fn.lower().endswith(".json"):
                 continue
             path = os.path.join(self.folder, fn)
             try:
-                with open(path, "r", encoding="utf-8") as fh:
-                    cfg = json.load(fh)
-                if not isinstance(cfg, dict):
-                    continue
-                exts = cfg.get("extensions", []) or cfg.get("ext", [])
-                norm = []
-                for e in exts:
-                    if not isinstance(e, str): continue
-                    if not e.startswith("."): e = "." + e
-                    norm.append(e.lower())
-                cfg["extensions"] = norm
-                self.available.append(cfg)
-                for e in norm:
-                    if e not in self.ext_map:
-                        self.ext_map[e] = cfg
-            except Exception as ex:
-                print(f"[ConfigManager] skipping {path}: {ex}")
+                st = os.stat(path)
+            except OSError:
+                continue
+            e = old.get(fn)
+            if not e or (e["mtime_ns"], e["size"]) != (st.st_mtime_ns, st.st_size):
+                e = {"file": fn, "mtime_ns": st.st_mtime_ns, "size": st.st_size, "name": None, "extensions": [], "ok": False}
+                try:
+                    cfg = self._read(fn)
+                    if cfg is not None:
+                        e.update(name=cfg.get("name"), extensions=cfg["extensions"], ok=True)
+                        self.loaded[fn] = (st.st_mtime_ns, st.st_size, cfg)
+                except Exception as ex:
+                    print(f"[ConfigManager] skipping {path}: {ex}")
+            index[fn] = e
+            if not e["ok"]: continue
+            self.available.append(e)
+            for ext in e["extensions"]:
+                if ext not in self.ext_map:
+                    self.ext_map[ext] = e
+        self.loaded = {fn: v for fn, v in self.loaded.items() if fn in index and v[:2] == (index[fn]["mtime_ns"], index[fn]["size"])}
+        self._index = index
+        if self.index_file and index != old:
+            try:
+                os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+                atomic_write(self.index_file, json.dumps({"version": self.INDEX_VERSION, "files": list(index.values())}))
+            except OSError as ex:
+                print(f"[ConfigManager] index not saved: {ex}")
+
+    def load(self, entry):
+        # the full config behind an index entry, read on first use
+        fn = entry["file"]
+        hit = self.loaded.get(fn)
+        if hit and hit[:2] == (entry["mtime_ns"], entry["size"]):
+            return hit[2]
+        try:
+            cfg = self._read(fn)
+        except (OSError, ValueError) as ex:
+            print(f"[ConfigManager] skipping {os.path.join(self.folder, fn)}: {ex}")
+            return None
+        if cfg is not None:
+            self.loaded[fn] = (entry["mtime_ns"], entry["size"], cfg)
+        return cfg
+
+    def file_of(self, cfg):
+        # name of the folder file a loaded config came from, None for one loaded from elsewhere
+        for fn, hit in self.loaded.items():
+            if hit[2] == cfg: return fn
+        return None
+
+    def load_file(self, fn):
+        # the config in folder file fn, None when it is gone or no longer usable
+        if self._index is None: self.scan()
+        e = next((e for e in self.available if e["file"] == fn), None)
+        return self.load(e) if e else None
 
     def detect_for_path(self, path):
         ext = os.path.splitext(path)[1].lower()
         if not ext: return None
-        return self.ext_map.get(ext)
+        if self._index is None: self.scan()     # asked for before a deferred first scan ran
+        e = self.ext_map.get(ext)
+        return self.load(e) if e else None
+
+# incremental highlighting helpers
+_PY_NONCODE = frozenset((tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.COMMENT, tokenize.ENDMARKER))
+_PY_LAYOUT = frozenset((tokenize.NL, tokenize.INDENT, tokenize.DEDENT))
+
+def changed_line_range(old, new):
+    # first changed line and number of unchanged trailing lines between two line lists
+    n = min(len(old), len(new)); a = 0
+    while a < n and old[a] == new[a]: a += 1
+    b = 0; lim = n - a
+    while b < lim and old[-1-b] == new[-1-b]: b += 1
+    return a, b
+
+def has_long_line(txt, cols):
+    # True when some line of txt is at least cols characters long
+    return len(txt) >= cols and re.search(r"(?m)^[^\n]{%d}" % cols, txt) is not None
+
+class PyTokens:
+    # a token stream as parallel lists: type, string and 1-based (line, col) start and end per token
+    __slots__ = ("types", "strings", "starts", "ends")
+
+    def __init__(self):
+        self.types, self.strings, self.starts, self.ends = [], [], [], []
+
+    def __len__(self):
+        return len(self.types)
+
+    def next_significant(self):
+        # index of the next token that is not NL/INDENT/DEDENT, for every token; -1 when there is none
+        types = self.types
+        nxt = [-1] * len(types); j = -1
+        for i in range(len(types) - 1, -1, -1):
+            nxt[i] = j
+            if types[i] not in _PY_LAYOUT: j = i
+        return nxt
+
+def tokenize_lines(lines, first=0, sync=None, resume=None, limit=None, end=None, cols=None):
+    # tokenize lines[first:end]; a line is "clean" (a safe resync point) when a logical line starts at column 0
+    # with balanced brackets. with resume set, stop at the first clean line >= resume that sync already marks as clean;
+    # with limit set, stop at the first clean line >= limit. with cols set, whole lines are still tokenized (a string
+    # may close past the cut) but tokens starting at or after that column are dropped and one-line tokens end there;
+    # a multi-line string starting past it keeps only its later lines
+    last = (len(lines) if end is None else end) - 1
+    def gen():
+        for r in range(first, last): yield lines[r] + "\n"
+        yield lines[last]
+    toks, clean = PyTokens(), []
+    types, strs, starts, ends = toks.types, toks.strings, toks.starts, toks.ends
+    OP, NEWLINE = tokenize.OP, tokenize.NEWLINE
+    at_start = True; depth = 0
+    try:
+        for ttype, tstr, start, tend, _ in tokenize.generate_tokens(gen().__next__):
+            if at_start and ttype not in _PY_NONCODE:
+                at_start = False
+                if start[1] == 0 and depth == 0:
+                    row = first + start[0] - 1
+                    if resume is not None and row >= resume and sync[row]:
+                        return toks, row, clean
+                    if limit is not None and row >= limit and row > first:
+                        return toks, row, clean
+                    clean.append(row)
+            elif ttype == NEWLINE:
+                at_start = True
+            if ttype == OP and depth >= 0:
+                # a stray closer leaves the tokenizer unbalanced for the rest of the pass
+                if tstr in "([{": depth += 1
+                elif tstr in ")]}": depth -= 1
+            if cols is not None and (start[1] >= cols or tend[1] > cols) and ttype != NEWLINE and ttype not in _PY_LAYOUT:
+                if start[1] >= cols:
+                    if start[0] == tend[0]: continue
+                    start = (start[0] + 1, 0); tstr = ""
+                if tend[1] > cols: tend = (tend[0], cols)
+            types.append(ttype); strs.append(tstr); starts.append(start); ends.append(tend)
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return toks, last + 1, clean
+
+# lazy (viewport-first) highlighting
+LAZY_MIN_LINES = 5000   # files at least this long are highlighted viewport-first
+LAZY_MARGIN = 60        # lines highlighted above and below the viewport
+LAZY_CHUNK = 400        # lines per background fill step
+LAZY_SLICE_MS = 15      # time budget of one background fill tick
+
+def guess_sync_line(lines, row, lookback=200):
+    # best guess at a clean line at or before row: a line starting at column 0 with a statement-like character.
+    # may land inside a multi-line string; callers only use it for provisional highlighting
+    for r in range(row, max(row - lookback, 0) - 1, -1):
+        ln = lines[r]
+        if ln and (ln[0].isalpha() or ln[0] in "_@"):
+            return r
+    return row
+
+def line_offsets(lines):
+    # character offset of the start of each line
+    offs = [0]*len(lines); off = 0
+    for i, ln in enumerate(lines): offs[i] = off; off += len(ln)+1
+    return offs
+
+def offset_rc(offs, i):
+    # character offset -> 1-based (line, col)
+    r = bisect.bisect_right(offs, i) - 1
+    return (r+1, i-offs[r])
+
+def coalesce_spans(spans):
+    # group (tag, start, end) spans by tag and merge overlapping or touching ranges;
+    # positions only need to be ordered, so offsets and (line, col) pairs both work
+    by_tag = {}
+    for tag, s, e in spans:
+        by_tag.setdefault(tag, []).append((s, e))
+    out = {}
+    for tag, ranges in by_tag.items():
+        ranges.sort(); merged = []
+        for s, e in ranges:
+            if merged and s <= merged[-1][1]:
+                if e > merged[-1][1]: merged[-1][1] = e
+            else:
+                merged.append([s, e])
+        out[tag] = merged
+    return out
+
+class SpanIndex:
+    # merged, sorted [start, end) intervals with O(log n) point lookup
+    def __init__(self, spans):
+        self.starts, self.ends = [], []
+        for s, e in sorted(spans):
+            if self.ends and s <= self.ends[-1]:
+                if e > self.ends[-1]: self.ends[-1] = e
+            else:
+                self.starts.append(s); self.ends.append(e)
+
+    def __contains__(self, i):
+        k = bisect.bisect_right(self.starts, i) - 1
+        return k >= 0 and i < self.ends[k]
+
+def spans_by_row(ranges, count):
+    # split coalesced {tag: [(start, end), ...]} ranges with 1-based (line, col) positions into per-line pieces
+    # for lines 1..count; a piece (tag, c0, -1) runs on through the end of its line, newline included
+    rows = [[] for _ in range(count)]
+    for tag, rs in ranges.items():
+        for (sr, sc), (er, ec) in rs:
+            for r in range(max(sr, 1), min(er, count) + 1):
+                c0 = sc if r == sr else 0
+                c1 = ec if r == er else -1
+                if c1 != c0: rows[r-1].append((tag, c0, c1))
+    return [tuple(sorted(row)) for row in rows]
+
+# cursor decorations
+DECORATION_TAGS = ("active_line", "word_occurrence", "bracket_match")
+BRACKET_PAIRS = {"(": ")", "[": "]", "{": "}", ")": "(", "]": "[", "}": "{"}
+BRACKET_SCAN_LINES = 2000   # lines searched either way for a matching bracket
+OCCURRENCE_MAX = 500        # occurrences of the word under the cursor marked in the viewport
+NONCODE_TAGS = frozenset(("string", "comment"))
+_BRACKET_RE = re.compile(r"[()\[\]{}]")
+_WORD_RE = re.compile(r"\w+")
+
+def line_brackets(line, pieces=()):
+    # (col, bracket) pairs of a line, leaving out the brackets inside its string and comment pieces
+    skip = [(c0, c1) for tag, c0, c1 in pieces if tag in NONCODE_TAGS]
+    out = []
+    for m in _BRACKET_RE.finditer(line):
+        c = m.start()
+        if not any(c0 <= c and (c1 < 0 or c < c1) for c0, c1 in skip): out.append((c, m.group()))
+    return out
+
+# single-pass regex scanning
+def leading_group(regex):
+    # True when the first capturing group starts where the match does (ignoring \b, ^ and lookbehinds)
+    r = re.sub(r"^(?:\\b|\^|\(\?<[!=](?:\\.|[^()\\])*\))*", "", regex)
+    return r.startswith("(") and not r.startswith("(?")
+
+class RegexScanner:
+    # a regex language's patterns, keyword sets and fallbacks merged into one alternation of named groups.
+    # priority: strings/comments, patterns that start with fixed context ("class X"), keywords, then patterns
+    # that start by capturing an identifier (calls, assignments). the text is walked once and the first alternative matching at a position wins
+    def __init__(self, patterns, keywords, fallbacks):
+        first, context, rest = [], [], []
+        for tag, cre, group in list(patterns) + list(fallbacks):
+            if re.search(r"\\[1-9]|\(\?P=", cre.pattern):
+                raise ValueError(f"backreferences cannot be merged: {cre.pattern}")
+            if group > cre.groups: group = 0
+            if tag in ("string", "comment"): first.append((tag, cre, group))
+            elif not leading_group(cre.pattern): context.append((tag, cre, group))
+            else: rest.append((tag, cre, group))
+        kws = [(tag, keyword_regex(words), 0) for tag, words in keywords.items() if words]
+        parts = []
+        self.alts = {}  # wrapper group number -> (tag, inner group)
+        n = 1
+        for k, (tag, cre, group) in enumerate(first + context + kws + rest):
+            fl = "".join(c for f, c in ((re.I, "i"), (re.M, "m"), (re.S, "s")) if cre.flags & f)
+            parts.append(f"(?P<a{k}>(?{fl}:{cre.pattern}))" if fl else f"(?P<a{k}>{cre.pattern})")
+            self.alts[n] = (tag, group)
+            n += 1 + cre.groups
+        self.cre = re.compile("|".join(parts))
+
+    def iter_spans(self, txt, pos=0, endpos=None):
+        for m in (self.cre.finditer(txt, pos) if endpos is None else self.cre.finditer(txt, pos, endpos)):
+            tag, group = self.alts[m.lastindex]
+            if not group:
+                yield (tag, m.start(), m.end())
+                continue
+            s, e = m.span(m.lastindex + group)
+            if s < 0: continue
+            # the context around the group is scanned on its own, so "class" in "class X" is still a keyword
+            if s > m.start(): yield from self.iter_spans(txt, m.start(), s)
+            yield (tag, s, e)
+            if e < m.end(): yield from self.iter_spans(txt, e, m.end())
+
+# compiled language cache
+LANG_CACHE_SIZE = 16    # compiled language configs kept around
+
+def keyword_regex(words):
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r")\b")
+
+class LanguageCache:
+    # compiled languages keyed by a hash of the config's content, least recently used evicted first.
+    # hits/misses count lookups so reuse can be checked from a shell or a benchmark
+    def __init__(self, size=LANG_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(cfg):
+        return hashlib.sha1(json.dumps(cfg, sort_keys=True, default=sorted).encode("utf-8")).hexdigest()
+
+    def get(self, cfg, build):
+        k = self.key(cfg)
+        if k in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(k)
+            return self.entries[k]
+        self.misses += 1
+        entry = self.entries[k] = build(cfg)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+
+# headless highlighting
+PYTHON_CONFIG = {"name":"Python (builtin)", "type":"python", "extensions":[".py"], "keywords":{}}
+BASE_TAGS = {"control","definition","import","exception","logic","constants","builtin","digits","symbols","paran",
+             "class_name","func_name","var_name","string","comment","module","self","self_attr", "fstring_prefix"}
+# identifier constructs every regex language gets: (tag, pattern, group)
+FALLBACK_PATTERNS = (
+    ("class_name", re.compile(r"\bclass\s+([A-Za-z_]\w*)"), 1),
+    ("func_name", re.compile(r"\bdef\s+([A-Za-z_]\w*)"), 1),
+    ("func_name", re.compile(r"(?<!\bdef\s)(?<!\bclass\s)\b([A-Za-z_]\w*)(?=\s*\()"), 1),
+    ("var_name", re.compile(r"\b([A-Za-z_]\w*)\s*=(?!=)"), 1),
+)
+LONG_LINE_COLS = 5000   # columns past which a line is left unhighlighted; a config may set its own "max_columns"
+MINIFIED_COLS = 20000   # a line this long marks a buffer as minified (see ConfigEditor.minified_mode)
+STATEMENT_SCAN_LINES = 50   # lines a def signature or an import is followed for names; an unclosed bracket has no end
+
+class Highlighter:
+    # a compiled language config and everything that turns text into spans. nothing here touches Tk, so the same
+    # engine runs in the editor (on its worker thread too), in the command line batch mode and in benchmarks
+    def __init__(self, cfg):
+        self.config = cfg
+        self.type = ltype = cfg.get("type", "regex")
+        cols = cfg.get("max_columns")
+        self.max_cols = cols if isinstance(cols, int) and cols > 0 else LONG_LINE_COLS
+        self._long_line = re.compile(r"(?m)^([^\n]{%d})([^\n]+)" % self.max_cols)   # see segments
+        self.patterns = patterns = []
+        self.keywords = keywords = {}
+        self.scanner = None
+
+        # compile regex patterns
+        if ltype == "regex":
+            for p in cfg.get("patterns", []):
+                regex = p.get("regex")
+                tag = p.get("tag")
+                group = int(p.get("group", 0)) if p.get("group", 0) else 0
+                flags = 0
+                fstr = p.get("flags", "") or ""
+                if "i" in fstr: flags |= re.IGNORECASE
+                if "m" in fstr: flags |= re.MULTILINE
+                if "s" in fstr: flags |= re.DOTALL
+                try:
+                    cre = re.compile(regex, flags)
+                    patterns.append((tag, cre, group))
+                except Exception as ex:
+                    print("[Highlighter] bad regex:", regex, ex)
+            for tag, words in cfg.get("keywords", {}).items():
+                if isinstance(words, (list,tuple,set)):
+                    keywords[tag] = set(words)
+            try:
+                self.scanner = RegexScanner(patterns, keywords, FALLBACK_PATTERNS)
+            except (ValueError, re.error) as ex:
+                print("[Highlighter] scanner disabled:", ex)
+        elif ltype == "python":
+            # python: optional keywords as fallback
+            for tag, words in cfg.get("keywords", {}).items():
+                if isinstance(words, (list,tuple,set)):
+                    keywords[tag] = set(words)
+
+        # add tags for keywords & pattern tags and base tags
+        tags_used = set(keywords.keys())
+        for tpl in patterns:
+            tags_used.add(tpl[0])
+        tags_used.update(BASE_TAGS)
+        self.tags = tags_used
+        self.keyword_res = {tag: keyword_regex(words) for tag, words in keywords.items() if words}
+        # word -> tag for the python pass; a word listed under several tags keeps the first
+        self.keyword_tags = {}
+        for tag, words in keywords.items():
+            for w in words: self.keyword_tags.setdefault(w, tag)
+
+    def spans(self, txt, scanner=True):
+        # (tag, start, end) character-offset spans of txt
+        if self.type != "python":
+            return self.regex_spans(txt, scanner)
+        lines = txt.split("\n")
+        toks, _, _ = tokenize_lines(lines, cols=self.max_cols)
+        offs = line_offsets(lines)
+        return [(tag, offs[sr-1] + sc, offs[er-1] + ec) for tag, (sr, sc), (er, ec) in self.structure_spans(toks)]
+
+    def compute(self, txt, scanner=True):
+        # a full pass for the editor: per-line tag pieces for _apply_rows, plus the python resync flags or the
+        # regex spans the incremental pass diffs against
+        lines = txt.split("\n")
+        res = {"lines": lines}
+        if self.type == "python":
+            toks, _, clean = tokenize_lines(lines, cols=self.max_cols)
+            res["sync"] = sync = bytearray(len(lines))
+            for r in clean: sync[r] = 1
+            spans = self.structure_spans(toks)
+        else:
+            res["regex"] = regex = self.regex_spans(txt, scanner)
+            offs = line_offsets(lines)
+            spans = [(tag, offset_rc(offs, s), offset_rc(offs, e)) for tag, s, e in regex]
+        res["rows"] = spans_by_row(coalesce_spans(spans), len(lines))
+        return res
+
+    def regex_spans(self, txt, scanner=True):
+        return list(self.iter_regex_spans(txt, scanner))
+
+    def _string_comment_spans(self, txt):
+        # strings and comments from the language's own "string"/"comment" patterns, scanned left to right so the
+        # leftmost match wins: a quote inside a comment or a comment marker inside a string starts nothing
+        pats = [(cre, group, tag) for tag, cre, group in self.patterns if tag in ("string", "comment")]
+        nxt = [cre.search(txt) for cre, _, _ in pats]
+        out = []; pos = 0
+        while True:
+            best = None
+            for k, (cre, group, tag) in enumerate(pats):
+                m = nxt[k]
+                if m is not None and m.start() < pos:
+                    m = nxt[k] = cre.search(txt, pos)
+                if m is not None and (best is None or m.start() < best[0].start()):
+                    best = (m, group, tag)
+            if best is None: break
+            m, group, tag = best
+            if group and m.lastindex and group <= m.lastindex:
+                out.append((tag, m.start(group), m.end(group)))
+            else:
+                out.append((tag, m.start(), m.end()))
+            pos = max(m.end(), m.start() + 1)
+        return out
+
+    def segments(self, txt):
+        # (start, end) offsets of the parts of txt that are highlighted: a long line ends its part at max_cols and
+        # the next part starts on the following line, so the scan resyncs there whatever the cut-off tail left open
+        if len(txt) <= self.max_cols: return [(0, len(txt))]
+        out, pos = [], 0
+        for m in self._long_line.finditer(txt):
+            out.append((pos, m.end(1)))
+            pos = m.end(2) + 1
+        out.append((min(pos, len(txt)), len(txt)))
+        return out
+
+    def iter_regex_spans(self, txt, scanner=True, start=0, long_lines=True):
+        # spans in start order. nothing past max_cols is highlighted: the tail of a long line is skipped, not scanned.
+        # with start set (a line start no span crosses) the scan begins there, for passes that resync mid-buffer;
+        # long_lines=False skips the search for long lines when the caller knows there are none
+        for lo, hi in (self.segments(txt) if long_lines else [(0, len(txt))]):
+            if hi < start: continue
+            lo = max(lo, start)
+            if scanner and self.scanner is not None:
+                yield from self.scanner.iter_spans(txt, lo, hi)
+            else:
+                for tag, s, e in sorted(self._fallback_spans(txt[lo:hi]), key=lambda sp: sp[1]):
+                    yield (tag, s + lo, e + lo)
+
+    def _fallback_spans(self, txt):
+        # strings & comments first; any other match starting inside one of them is dropped
+        found = self._string_comment_spans(txt)
+        yield from found
+        skip = SpanIndex((s, e) for _, s, e in found)
+
+        # regex patterns
+        for tag, cre, group in self.patterns:
+            if tag in ("string", "comment"): continue
+            for m in cre.finditer(txt):
+                if group and m.lastindex and group <= m.lastindex:
+                    s, e = m.start(group), m.end(group)
+                else:
+                    s, e = m.start(), m.end()
+                if s in skip: continue
+                yield (tag, s, e)
+        # keywords
+        for tag, cre in self.keyword_res.items():
+            for m in cre.finditer(txt):
+                s, e = m.start(), m.end()
+                if s in skip: continue
+                yield (tag, s, e)
+        # fallback constructs
+        for tag, pat, _ in FALLBACK_PATTERNS:
+            for m in pat.finditer(txt):
+                i = m.start(1)
+                if i in skip: continue
+                yield (tag, i, m.end(1))
+
+    def structure_spans(self, toks):
+        # PyTokens -> (tag, (line, col), (line, col)) spans, lines counted from 1 at the first tokenized line.
+        # one pass over the parallel arrays; nxt[i] is the next significant token after i (-1 past the end)
+        types, strs, starts, ends = toks.types, toks.strings, toks.starts, toks.ends
+        nxt = toks.next_significant()
+        kw = self.keyword_tags
+        NAME, OP, STRING, COMMENT, NEWLINE = tokenize.NAME, tokenize.OP, tokenize.STRING, tokenize.COMMENT, tokenize.NEWLINE
+        spans = []
+        add = spans.append
+        n = len(types)
+
+        for i in range(n):
+            ttype = types[i]
+            if ttype == NAME:
+                tstr = strs[i]
+                if tstr == "def":
+                    j = nxt[i]
+                    if j > 0 and types[j] == NAME:
+                        add(("func_name", starts[j], ends[j]))
+                        # params
+                        lim = starts[j][0] + STATEMENT_SCAN_LINES
+                        k = j+1
+                        while k < n and strs[k] != "(" and types[k] != NEWLINE and starts[k][0] <= lim:
+                            k += 1
+                        if k < n and strs[k] == "(":
+                            depth = 0; m = k
+                            while m < n and starts[m][0] <= lim:
+                                ts = strs[m]
+                                if ts == "(":
+                                    depth += 1
+                                elif ts == ")":
+                                    depth -= 1
+                                    if depth == 0: break
+                                if depth > 0 and types[m] == NAME:
+                                    add(("var_name", starts[m], ends[m]))
+                                m += 1
+                    continue
+                if tstr == "class":
+                    j = nxt[i]
+                    if j > 0 and types[j] == NAME:
+                        add(("class_name", starts[j], ends[j]))
+                    continue
+                if tstr == "import":
+                    j = nxt[i]
+                    lim = starts[i][0] + STATEMENT_SCAN_LINES
+                    while j > 0 and j < n and types[j] != NEWLINE and strs[j] != ";" and starts[j][0] <= lim:
+                        if types[j] == NAME:
+                            start_pos = starts[j]; end_pos = ends[j]
+                            k = j+1
+                            while k+1 < n and strs[k] == "." and types[k+1] == NAME:
+                                end_pos = ends[k+1]; k += 2
+                            add(("module", start_pos, end_pos))
+                            j = k
+                        else:
+                            j += 1
+                    continue
+                if tstr == "from":
+                    j = nxt[i]
+                    if j > 0 and types[j] == NAME:
+                        start_pos = starts[j]; end_pos = ends[j]
+                        k = j+1
+                        while k+1 < n and strs[k] == "." and types[k+1] == NAME:
+                            end_pos = ends[k+1]; k += 2
+                        add(("module", start_pos, end_pos))
+                        # imported names
+                        lim = starts[i][0] + STATEMENT_SCAN_LINES
+                        l = k
+                        while l < n and strs[l] != "import" and types[l] != NEWLINE and starts[l][0] <= lim: l += 1
+                        if l < n and strs[l] == "import":
+                            m = l+1
+                            while m < n and types[m] != NEWLINE and strs[m] != ";" and starts[m][0] <= lim:
+                                if types[m] == NAME:
+                                    add(("module", starts[m], ends[m]))
+                                m += 1
+                    continue
+                if tstr == "self":
+                    add(("self", starts[i], ends[i]))
+                    if i+2 < n and strs[i+1] == "." and types[i+2] == NAME:
+                        add(("self_attr", starts[i+2], ends[i+2]))
+                    continue
+                # call detection, then assignment
+                nj = nxt[i]
+                if nj > 0 and types[nj] == OP:
+                    if strs[nj] == "(":
+                        add(("func_name", starts[i], ends[i]))
+                        continue
+                    if strs[nj] == "=":
+                        add(("var_name", starts[i], ends[i]))
+                        continue
+                # keywords from config
+                tag = kw.get(tstr)
+                if tag: add((tag, starts[i], ends[i]))
+            elif ttype == STRING:
+                sidx = starts[i]
+                add(("string", sidx, ends[i]))
+                if strs[i][:2] in ('f"', "f'", 'F"', "F'"):
+                    add(("fstring_prefix", sidx, (sidx[0], sidx[1]+1)))
+            elif ttype == COMMENT:
+                add(("comment", starts[i], ends[i]))
+        return spans
+
+# background highlighting
+HL_POLL_MS = 15         # how often the Tk thread checks for worker results
+HL_APPLY_BATCH = 2000   # tag ranges applied per event-loop tick
+HL_SYNC_LINES = 500     # lines an edit pass re-tokenizes on the Tk thread before the worker takes over
+HL_RESCAN_LINES = 50    # lines before an edit a regex pass rescans from
+
+class HighlightWorker:
+    # tokenizes buffer snapshots off the Tk thread; only the newest request is kept
+    def __init__(self, compute):
+        self.compute = compute
+        self.results = queue.Queue()
+        self._job = None
+        self._cv = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, gen, *args):
+        with self._cv:
+            self._job = (gen, args)
+            self._cv.notify()
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while self._job is None: self._cv.wait()
+                gen, args = self._job; self._job = None
+            try:
+                res = self.compute(*args)
+            except Exception as ex:
+                res = ex
+            self.results.put((gen, res))
+
+# streaming file open
+STREAM_MIN_BYTES = 4 << 20  # files at least this big are read in chunks while the UI stays live
+STREAM_CHUNK = 256 << 10    # bytes per read
+STREAM_QUEUE = 8            # chunks read ahead of the widget
+STREAM_POLL_MS = 5
+
+class FileReader:
+    # reads and decodes a file in chunks on a worker thread. the Tk side drains self.chunks:
+    # (bytes read so far, text) items, then None at the end or the exception that stopped the read
+    def __init__(self, path, chunk=STREAM_CHUNK):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.chunks = queue.Queue(maxsize=STREAM_QUEUE)
+        self.cancelled = threading.Event()
+        threading.Thread(target=self._run, args=(chunk,), daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _put(self, item):
+        # bounded queue: the reader never gets more than STREAM_QUEUE chunks ahead
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self, chunk):
+        dec = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+        done = 0
+        try:
+            with open(self.path, "rb") as fh:
+                while not self.cancelled.is_set():
+                    data = fh.read(chunk)
+                    done += len(data)
+                    txt = dec.decode(data, final=not data)
+                    if txt and not self._put((done, txt)): return
+                    if not data: break
+            self._put(None)
+        except Exception as ex:
+            self._put(ex)
+
+# large-file viewer
+VIEWER_MIN_BYTES = 256 << 20  # files at least this big are shown read-only through a memory-mapped line index
+VIEWER_PAGE = 3000            # lines held in the widget at once
+VIEWER_EDGE = 500             # a new page is cut when the view gets this close to either end of the current one
+INDEX_BLOCK = 4 << 20         # bytes scanned per step of the index pass
+INDEX_POLL_MS = 100
+
+class LineIndex:
+    # a memory-mapped file and the byte offsets its lines start at (starts[i] for 0-based line i).
+    # the offsets are collected on a worker thread; count only includes lines whose end has been seen
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        self.mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.mm)
+        self.starts = array("Q", [0])
+        self.scanned = 0
+        self.complete = False
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        mm, starts, pos = self.mm, self.starts, 0
+        while pos < self.size and not self._cancelled.is_set():
+            block = mm[pos:pos + INDEX_BLOCK]
+            found = array("Q")
+            i = block.find(b"\n")
+            while i >= 0:
+                found.append(pos + i + 1)
+                i = block.find(b"\n", i + 1)
+            # one extend per block, so the Tk thread never sees a half-written run of offsets
+            starts.extend(found)
+            pos += len(block)
+            self.scanned = pos
+        self.complete = not self._cancelled.is_set()
+
+    @property
+    def count(self):
+        return len(self.starts) if self.complete else len(self.starts) - 1
+
+    def line_of(self, off):
+        return bisect.bisect_right(self.starts, off) - 1
+
+    def text(self, a, b):
+        # lines a..b-1 decoded, joined by "\n" and without a trailing newline
+        end = self.starts[b] - 1 if b < len(self.starts) else self.size
+        txt = self.mm[self.starts[a]:max(self.starts[a], end)].decode("utf-8", errors="replace").replace("\r\n", "\n")
+        return txt[:-1] if txt.endswith("\r") else txt
+
+    def find(self, pat, pos, backwards=False):
+        # byte offset of the next (or previous) case-insensitive match of pat from pos, or -1
+        cre = re.compile(re.escape(pat.encode("utf-8")), re.IGNORECASE)
+        if not backwards:
+            m = cre.search(self.mm, pos)
+            return m.start() if m else -1
+        end = pos
+        while end > 0:
+            lo = max(0, end - INDEX_BLOCK)
+            last = None
+            for last in cre.finditer(self.mm, lo, end): pass
+            if last: return last.start()
+            end = lo + len(pat.encode("utf-8")) - 1 if lo else 0
+        return -1
+
+    def close(self):
+        self._cancelled.set()
+        self._thread.join()
+        self.mm.close()
+        self._fh.close()
+
+# find
+FIND_PAINT_MAX = 2000   # most matches painted in the viewport at once
+
+class FindIndex:
+    # every match of one query in a buffer snapshot, as sorted start/end character offsets.
+    # for a literal query on one line, update() re-scans only the lines an edit touched and shifts the matches
+    # after them. a regex may match across lines, or match differently depending on where the previous match
+    # ended, so a regex query is re-scanned in full
+    def __init__(self, pattern, regex=False, case=False):
+        self.query = (pattern, regex, case)
+        self.cre = re.compile(pattern if regex else re.escape(pattern), 0 if case else re.IGNORECASE)
+        self.incremental = not regex and "\n" not in pattern
+        self.lines = None
+        self.offs = []
+        self.starts = []
+        self.ends = []
+        self.gen = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _scan(self, txt, lo, hi):
+        # matches starting in [lo, hi); empty matches are not kept
+        out_s, out_e = [], []
+        for m in self.cre.finditer(txt, lo):
+            if m.start() >= hi: break
+            if m.end() > m.start():
+                out_s.append(m.start()); out_e.append(m.end())
+        return out_s, out_e
+
+    def update(self, txt):
+        lines = txt.split("\n")
+        old = self.lines
+        self.lines = lines
+        if old is None or not self.incremental:
+            self.offs = line_offsets(lines)
+            self.starts, self.ends = self._scan(txt, 0, len(txt))
+            return
+        a, b = changed_line_range(old, lines)
+        if a == len(old) == len(lines): return
+        # re-scan the edited lines plus one line of context on each side
+        a = max(0, a - 1)
+        old_stop = min(len(old), len(old) - b + 1)
+        new_stop = min(len(lines), len(lines) - b + 1)
+        offs = self.offs
+        lo = offs[a]
+        old_hi = offs[old_stop] if old_stop < len(old) else offs[-1] + len(old[-1]) + 1
+        delta = len(txt) + 1 - (offs[-1] + len(old[-1]) + 1)
+        new_hi = old_hi + delta
+        # a match running into the edited lines from above is re-scanned too
+        i = bisect.bisect_left(self.starts, lo)
+        while i > 0 and self.ends[i-1] > lo: i -= 1
+        if i < len(self.starts): lo = min(lo, self.starts[i])
+        j = bisect.bisect_left(self.starts, old_hi)
+        mid_s, mid_e = self._scan(txt, lo, new_hi)
+        cut = mid_e[-1] if mid_e else lo
+        tail = [(s + delta, e + delta) for s, e in zip(self.starts[j:], self.ends[j:]) if s + delta >= cut]
+        self.starts[i:] = mid_s + [s for s, _ in tail]
+        self.ends[i:] = mid_e + [e for _, e in tail]
+        mid = line_offsets(lines[a:new_stop])
+        self.offs = offs[:a] + [offs[a] + o for o in mid] + [o + delta for o in offs[old_stop:]]
+
+    def next(self, off):
+        # first match starting at or after off, wrapping to the first one
+        k = bisect.bisect_left(self.starts, off)
+        return k if k < len(self.starts) else 0
+
+    def prev(self, off):
+        # last match starting before off, wrapping to the last one
+        k = bisect.bisect_left(self.starts, off) - 1
+        return k if k >= 0 else len(self.starts) - 1
+
+    def offset(self, line, col):
+        # 1-based line, 0-based col -> character offset
+        return self.offs[min(line, len(self.offs)) - 1] + col
+
+    def index(self, off):
+        return "%d.%d" % offset_rc(self.offs, off)
+
+# find in files
+FIF_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+FIF_CHUNK = 1 << 20     # bytes read per step while searching a file
+FIF_MAX_HITS = 5000     # hits listed per search; counting goes on past it
+FIF_POLL_MS = 50
+
+class GitIgnore:
+    # .gitignore rules collected while walking a tree; the last matching rule wins, "!" re-includes
+    def __init__(self):
+        self.rules = []
+
+    def add(self, base, path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as fh:
+                for ln in fh:
+                    ln = ln.strip()
+                    if not ln or ln.startswith("#"): continue
+                    neg = ln.startswith("!")
+                    if neg: ln = ln[1:]
+                    dir_only = ln.endswith("/")
+                    ln = ln.rstrip("/")
+                    anchored = "/" in ln
+                    self.rules.append((base, ln.lstrip("/"), neg, dir_only, anchored))
+        except OSError:
+            pass
+
+    def ignored(self, path, is_dir):
+        hit = False
+        for base, pat, neg, dir_only, anchored in self.rules:
+            if dir_only and not is_dir: continue
+            if base and not path.startswith(base + "/"): continue
+            rel = path[len(base) + 1:] if base else path
+            if fnmatch.fnmatch(rel if anchored else rel.rsplit("/", 1)[-1], pat):
+                hit = not neg
+        return hit
+
+def walk_files(root):
+    # relative paths of the files under root, skipping .git and whatever .gitignore files exclude
+    ignore = GitIgnore()
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        folder = os.path.join(root, rel) if rel else root
+        if os.path.isfile(os.path.join(folder, ".gitignore")):
+            ignore.add(rel, os.path.join(folder, ".gitignore"))
+        try:
+            entries = sorted(os.scandir(folder), key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for e in entries:
+            path = f"{rel}/{e.name}" if rel else e.name
+            try:
+                is_dir = e.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if e.name == ".git" or ignore.ignored(path, is_dir): continue
+            if is_dir: subdirs.append(path)
+            elif e.is_file(): yield path
+        stack.extend(reversed(subdirs))
+
+def search_file(path, cre):
+    # (line, col, length, text) of each match, reading the file in chunks; None for binary files
+    hits = []
+    with open(path, "rb") as fh:
+        head = fh.read(8192)
+        if b"\0" in head: return None
+        dec = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+        rest = ""
+        line = 1
+        data = head
+        while True:
+            more = fh.read(FIF_CHUNK)
+            txt = rest + dec.decode(data, final=not more)
+            lines = txt.split("\n")
+            rest = lines.pop() if more else ""
+            for ln in lines:
+                for m in cre.finditer(ln):
+                    if m.end() > m.start(): hits.append((line, m.start(), m.end() - m.start(), ln.strip()[:200]))
+                line += 1
+            if not more: break
+            data = more
+    return hits
+
+class FileSearch:
+    # searches every file under root on a thread pool; results arrive on self.results as
+    # (path, hits) per file with hits, then None once the walk and all searches are done
+    def __init__(self, root, cre):
+        self.root = root
+        self.cre = cre
+        self.results = queue.Queue()
+        self.files = 0
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.cancelled = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=FIF_WORKERS) as pool:
+            for path in walk_files(self.root):
+                if self.cancelled.is_set(): break
+                pool.submit(self._search, path)
+        self.results.put(None)
+
+    def _search(self, path):
+        if self.cancelled.is_set(): return
+        try:
+            hits = search_file(os.path.join(self.root, path), self.cre)
+        except (OSError, ValueError):
+            hits = None
+        with self._lock:
+            self.files += 1
+        if hits: self.results.put((path, hits))
+
+# file bar model
+WATCH_INTERVAL = 1.0    # seconds between mtime checks of the cached directories
+WATCH_POLL_MS = 250
+FILTER_MAX_DIRS = 2000  # directories a fuzzy filter may list
+
+class DirModel:
+    # cached os.scandir listings keyed by "/"-joined directory path relative to root. a directory is
+    # only listed again once its mtime moves; a watcher thread checks the cached ones and reports changes
+    def __init__(self, root="."):
+        self.root = root
+        self.dirs = {}      # rel -> (mtime_ns, [(name, is_dir), ...]) with directories first
+        self.changed = queue.Queue()
+        self._lock = threading.Lock()
+        self._files = None  # files() as last built on a thread, see cached_files
+        self._files_stale = False
+        self._files_building = False
+
+    def _path(self, rel):
+        return os.path.join(self.root, rel) if rel else self.root
+
+    def _scan(self, rel):
+        path = self._path(rel)
+        mtime = os.stat(path).st_mtime_ns
+        items = []
+        with os.scandir(path) as it:
+            for e in it:
+                if e.name == ".git": continue
+                try:
+                    items.append((e.name, e.is_dir()))
+                except OSError:
+                    pass
+        items.sort(key=lambda t: (not t[1], t[0].lower()))
+        return mtime, items
+
+    def listing(self, rel=""):
+        with self._lock:
+            hit = self.dirs.get(rel)
+        if hit is None:
+            try:
+                hit = self._scan(rel)
+            except OSError:
+                return []
+            with self._lock:
+                self.dirs[rel] = hit
+        return hit[1]
+
+    def check(self):
+        # re-list the cached directories whose mtime changed; returns their paths
+        changed = []
+        with self._lock:
+            cached = list(self.dirs.items())
+        for rel, (mtime, _) in cached:
+            try:
+                if os.stat(self._path(rel)).st_mtime_ns == mtime: continue
+                hit = self._scan(rel)
+            except OSError:
+                hit = None
+            with self._lock:
+                if hit: self.dirs[rel] = hit
+                else: self.dirs.pop(rel, None)
+                self._files_stale = True
+            changed.append(rel)
+        return changed
+
+    def watch(self, interval=WATCH_INTERVAL):
+        def run():
+            while True:
+                time.sleep(interval)
+                changed = self.check()
+                if changed: self.changed.put(changed)
+        threading.Thread(target=run, daemon=True).start()
+
+    def files(self, max_dirs=FILTER_MAX_DIRS):
+        # every file path under root, breadth first, listing at most max_dirs directories
+        out, todo, seen = [], [""], 0
+        while todo and seen < max_dirs:
+            rel = todo.pop(0)
+            seen += 1
+            for name, is_dir in self.listing(rel):
+                path = f"{rel}/{name}" if rel else name
+                if is_dir: todo.append(path)
+                else: out.append(path)
+        return out
+
+    def cached_files(self):
+        # files() without touching the disk on the calling thread: the last list built, or None before the first.
+        # a missing or stale list is rebuilt on a thread, which puts an empty change on self.changed when done
+        with self._lock:
+            files = self._files
+            if (files is not None and not self._files_stale) or self._files_building: return files
+            self._files_building = True
+            self._files_stale = False
+        def run():
+            built = self.files()
+            with self._lock:
+                self._files, self._files_building = built, False
+            self.changed.put([])
+        threading.Thread(target=run, daemon=True).start()
+        return files
+
+def fuzzy_score(query, text):
+    # None unless query's characters appear in order in text (case-insensitive); lower is a better match
+    t = text.lower()
+    pos = t.rfind("/") + 1
+    score = 0
+    for ch in query.lower():
+        i = t.find(ch, pos)
+        if i < 0: break
+        score += i - pos
+        pos = i + 1
+    else:
+        return score, len(text)
+    # not all in the file name: try the whole path, ranked after name matches
+    pos = 0
+    score = 1000
+    for ch in query.lower():
+        i = t.find(ch, pos)
+        if i < 0: return None
+        score += i - pos
+        pos = i + 1
+    return score, len(text)
+
+# saving
+SAVE_POLL_MS = 20
+
+# mkstemp creates files 0600; a new file gets the mode open() would have given it
+_UMASK = os.umask(0); os.umask(_UMASK)
+
+def atomic_write(path, text):
+    # write a temp file next to path, fsync it and move it over path: a crash leaves either the old file or the new one.
+    # a symlink is written through, not replaced
+    import tempfile
+    path = os.path.realpath(path)
+    folder = os.path.dirname(path)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if os.path.exists(path): shutil.copymode(path, tmp)
+        else: os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, "O_DIRECTORY"):
+        # make the rename itself durable
+        dfd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        except OSError:
+            pass
+        finally:
+            os.close(dfd)
+
+# documents
+TAB_MEMORY_BUDGET = 50_000_000  # characters inactive tabs may keep in live widgets
+# editor attributes that belong to the active document; they are swapped in and out on tab switches
+DOC_STATE = ("text_area", "file_path", "lang_config", "highlighter",
+             "_hl_lines", "_hl_sync", "_hl_spans", "_hl_cfg", "_hl_rows", "_hl_rows_lines", "_viewer", "_find", "_find_cur", "_span_src",
+             "_deco", "_degraded", "_stream")
+
+class Document:
+    # one open buffer. the active document's DOC_STATE lives on the editor itself; an inactive one keeps
+    # it in self.state. an evicted document has no widget left, only its path, language and unsaved text
+    def __init__(self, state):
+        self.state = state
+        self.used = 0               # LRU clock value of the last activation
+        self.size = 0               # characters in the widget when it was last parked
+        self.dirty = False
+        self.edits = 0
+        self.stale = False          # highlighting was interrupted; re-run on activation
+        self.view = ("1.0", 0.0)    # insert mark and first visible fraction
+        self.text = None            # unsaved text of an evicted document
+
+    @property
+    def path(self):
+        # as of the last park: Save As on the active document only updates the editor's file_path, so callers that
+        # may hold the active document go through ConfigEditor._path_of
+        return self.state.get("file_path")
+
+    @property
+    def live(self):
+        return self.state.get("text_area") is not None
+
+# session and highlight cache
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".damedit")
+SESSION_FILE = os.path.join(STATE_DIR, "session.json")
+SPAN_CACHE_DIR = os.path.join(STATE_DIR, "spans")
+SPAN_CACHE_MIN_BYTES = 256 << 10  # smaller files highlight faster than their cache entry loads
+SPAN_CACHE_BYTES = 256 << 20      # disk budget of the span cache; least recently read entries go first
+SPAN_MAGIC = b"DSPN3\n"
+
+class SpanCache:
+    # finished highlight passes on disk, one file per (path, mtime, size, language config). an entry is a json
+    # header line (tag names, counts, byte order) followed by int32 arrays: pieces per line, then (tag, c0, c1)
+    # per piece, then the python resync flags as bytes or the regex spans as int64 (tag, start, end) triples
+    def __init__(self, folder=SPAN_CACHE_DIR, budget=SPAN_CACHE_BYTES):
+        self.folder = folder
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def source(path):
+        # what identifies the file's contents to the cache; None for files too small to be worth it
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size < SPAN_CACHE_MIN_BYTES: return None
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    def _file(self, src, cfg):
+        key = hashlib.sha1(json.dumps([list(src), LanguageCache.key(cfg)]).encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, key + ".spans")
+
+    def load(self, src, cfg, count):
+        # the result has the shape of Highlighter.compute's, minus "lines"; None if there is no usable entry
+        path = self._file(src, cfg)
+        try:
+            with open(path, "rb") as fh:
+                if fh.readline() != SPAN_MAGIC: raise ValueError("not a span cache entry")
+                head = json.loads(fh.readline())
+                if head["order"] != sys.byteorder or head["lines"] != count: raise ValueError("stale entry")
+                counts = array("i"); counts.fromfile(fh, count)
+                pieces = array("i"); pieces.fromfile(fh, 3 * head["pieces"])
+                res = {"cached": True}
+                if head["kind"] == "sync":
+                    res["sync"] = bytearray(fh.read(count))
+                    if len(res["sync"]) != count: raise EOFError
+                else:
+                    spans = array("q"); spans.fromfile(fh, 3 * head["spans"])
+            # a corrupt entry can point past its tag table or piece array: that is a miss too
+            names = head["tags"]
+            rows, k = [], 0
+            for n in counts:
+                rows.append(tuple((names[pieces[j]], pieces[j+1], pieces[j+2]) for j in range(k, k + 3*n, 3)))
+                k += 3*n
+            res["rows"] = rows
+            if "sync" not in res:
+                res["regex"] = [(names[spans[j]], spans[j+1], spans[j+2]) for j in range(0, len(spans), 3)]
+            os.utime(path)
+        except (OSError, ValueError, KeyError, EOFError, IndexError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return res
+
+    def store(self, src, cfg, rows, sync=None, regex=None):
+        tags = {}
+        counts, pieces = array("i"), array("i")
+        for row in rows:
+            counts.append(len(row))
+            for tag, c0, c1 in row:
+                pieces.extend((tags.setdefault(tag, len(tags)), c0, c1))
+        spans = array("q")
+        for tag, a, b in regex or ():
+            spans.extend((tags.setdefault(tag, len(tags)), a, b))
+        head = {"order": sys.byteorder, "lines": len(counts), "pieces": len(pieces) // 3, "spans": len(spans) // 3,
+                "kind": "sync" if sync is not None else "regex", "tags": sorted(tags, key=tags.get)}
+        path = self._file(src, cfg)
+        import tempfile
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.folder)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(SPAN_MAGIC)
+                fh.write(json.dumps(head).encode("utf-8") + b"\n")
+                counts.tofile(fh); pieces.tofile(fh)
+                if sync is not None: fh.write(sync)
+                else: spans.tofile(fh)
+            os.replace(tmp, path)
+            self.prune()
+        except OSError as ex:
+            print(f"[SpanCache] not stored: {ex}")
+
+    def prune(self):
+        entries = []
+        for e in os.scandir(self.folder):
+            if e.name.endswith(".spans"):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.budget: break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+# startup
+STARTUP_BUDGET_MS = 500     # time to first paint that --startup-check holds the editor to
+
+class StartupTimer:
+    # wall time of each phase of opening the editor, counted from the start of this module's import
+    def __init__(self):
+        self.phases = [("imports", _IMPORTED - _STARTED)]   # (name, seconds since the previous mark)
+        self.last = _IMPORTED
+        self.first_paint = None     # seconds from the start to the first paint
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+        return now - _STARTED
+
+    def report(self, budget_ms=STARTUP_BUDGET_MS):
+        out = [f"  {name:<16}{dt*1000:9.1f} ms" for name, dt in self.phases]
+        if self.first_paint is not None:
+            verdict = "ok" if self.first_paint * 1000 <= budget_ms else "OVER BUDGET"
+            out.append(f"first paint after {self.first_paint*1000:.1f} ms (budget {budget_ms} ms): {verdict}")
+        out.append(f"ready after {(self.last - _STARTED)*1000:.1f} ms")
+        return "startup:\n" + "\n".join(out)
 
 # Editor
+ICON_PATH = os.path.join("assets", "DamEdit.ico")
+
 class ConfigEditor(tk.Tk):
-    def __init__(self):
+    # startup_report: None, "print" (print the startup report once deferred work is done) or "check" (print it,
+    # then close; self.startup_ok tells whether the first paint made STARTUP_BUDGET_MS)
+    def __init__(self, startup_report=None):
+        self.startup = StartupTimer()
+        self.startup.mark("module setup")
+        self.startup_report = startup_report
+        self.startup_ok = None
         super().__init__()
+        self.startup.mark("tk")
         self.title("DamEdit")
-        self.iconbitmap("assets\\DamEdit.ico")
+        self._set_icon(self)
         self.geometry("980x700")
         self.minsize(760, 420)
 
         # state
-        self.config_manager = ConfigManager("configs")
+        self.config_manager = ConfigManager(CONFIG_DIR, STATE_DIR, scan=False)
         self.lang_config = None
-        self.lang_patterns = []
-        self.lang_keywords = {}
+        self.highlighter = None # Highlighter of the current language
+        self.regex_scanner = True
+        self.lang_cache = LanguageCache()
         self.theme = dict(DEFAULT_THEME)
         self.file_path = None
+        self.incremental_highlight = True
+        self._hl_lines = None   # buffer lines as of the last highlight pass
+        self._hl_sync = None    # python: per-line tokenizer resync flags
+        self._hl_spans = None   # regex: (tag, start, end) spans of the last pass
+        self._hl_cfg = None
+        self.lazy_highlight = True
+        self.minified_mode = True   # buffers with a MINIFIED_COLS line get wrapped lines and no syntax highlighting
+        self._degraded = None   # True in that mode; False once turned off by hand, None while left to detection
+        self._lazy = None       # state of a running viewport-first fill
+        self._lazy_job = None
+        self._scroll_job = None
+        self.background_highlight = True
+        self._hl_gen = 0        # edit generation; bumped on every buffer edit
+        self._hl_pending = None # generation of the request the worker is busy with
+        self._hl_apply = None   # worker result being applied in batches
+        self._poll_job = None
+        self._hl_worker = HighlightWorker(Highlighter.compute)
+        self.tag_calls = 0      # tag_add/tag_remove calls issued by the highlighter
+        self.tag_mutations = 0  # ranges passed to those calls
+        self._hl_rows = None    # per-line tag pieces the widget holds, as of _hl_rows_lines
+        self._hl_rows_lines = None
+        self._deco = None       # decoration tag -> (regions it painted, what they were painted for)
+        self._deco_job = None
+        self._ln_width = 0      # gutter width in pixels
+        self._ln_drawn = None   # (line, y) pairs the gutter currently shows
+        self._stream = None     # state of a running chunked open
+        self._viewer = None     # large-file viewer: line index and the lines currently paged in
+        self._find = None       # FindIndex of the current query
+        self._find_cur = None   # start offset of the selected match
+        self._find_job = None
+        self.fif_win = None     # find in files panel
+        self._fif = None        # running FileSearch
+        self._fif_job = None
+        self.dir_model = DirModel(".")
+        self._file_rows = []    # (path, is_dir) per file bar row
+        self._file_lines = []   # text of each file bar row, as shown
+        self._expanded = set()  # directories open in the file bar
+        self._save = None       # write in flight: path, snapshot time, document
+        self._save_queue = {}   # document -> (path, rename) of the save waiting for it, oldest request first
+        self.docs = []          # open documents, in tab order
+        self._doc = None        # the active one
+        self._doc_clock = 0
+        self.tab_memory_budget = TAB_MEMORY_BUDGET
+        self.session_file = SESSION_FILE
+        self._session_pending = {}  # abspath -> session entry, applied once that file has loaded
+        self._fif_pending = {}      # abspath -> find in files hit (line, col, length) to select once it has loaded
+        self.span_cache = SpanCache()
+        self._span_src = None   # SpanCache.source of the file in the buffer, while the buffer still matches it
+        self._restored = False  # the session was read back; until then closing must not overwrite it
 
         # UI colors, read from theme during apply_theme
         self.editor_bg = self.theme.get("editor_bg")
@@ -101,28 +1427,62 @@ class ConfigEditor(tk.Tk):
         self.accent = self.theme.get("accent")
         self.cursor = self.theme.get("cursor")
 
-        self._compile_fallbacks()
+        self.startup.mark("state")
 
         # build UI
         self._setup_style()
         self._build_ui()
         self._bind_shortcuts()
+        self._doc = Document({})
+        self.docs.append(self._doc)
+        self._render_tabs()
+        self.startup.mark("ui")
 
         # start with python builtin
-        self.load_language_config({"name":"Python (builtin)", "type":"python", "extensions":[".py"], "keywords":{}})
-        self._populate_file_list()
+        self.load_language_config(PYTHON_CONFIG)
+        self.startup.mark("language")
 
         # debounce
         self._highlight_job = None
 
-    # compile small fallbacks
-    def _compile_fallbacks(self):
-        self._pat_class = re.compile(r"\bclass\s+([A-Za-z_]\w*)")
-        self._pat_def   = re.compile(r"\bdef\s+([A-Za-z_]\w*)")
-        self._pat_call  = re.compile(r"(?<!\bdef\s)(?<!\bclass\s)\b([A-Za-z_]\w*)(?=\s*\()")
-        self._pat_var   = re.compile(r"\b([A-Za-z_]\w*)\s*=(?!=)")
-        self._pat_self_attr = re.compile(r"\bself\.([A-Za-z_]\w*)")
-        self._pat_self = re.compile(r"\bself\b")
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # the config scan, the file bar listing and the session wait until the empty editor is on screen
+        self.after_idle(self._first_paint)
+
+    def _first_paint(self):
+        self.update_idletasks()
+        self.startup.first_paint = self.startup.mark("first paint")
+        steps = [("configs", self.config_manager.scan), ("file list", self._list_files), ("session", self._restore_session)]
+        def run():
+            name, fn = steps.pop(0)
+            fn()
+            self.startup.mark(name)
+            if steps: self.after(1, run)
+            else: self._startup_done()
+        self.after(1, run)
+
+    def _list_files(self):
+        # the root directory is listed on a thread; the file bar is drawn when _poll_dir_changes picks it up
+        def run():
+            self.dir_model.listing("")
+            self.dir_model.changed.put([""])
+        threading.Thread(target=run, daemon=True).start()
+        self.dir_model.watch()
+        self.after(WATCH_POLL_MS, self._poll_dir_changes)
+
+    def _startup_done(self):
+        if not self.startup_report: return
+        print(self.startup.report(), file=sys.stderr)
+        if self.startup_report == "check":
+            self.startup_ok = self.startup.first_paint * 1000 <= STARTUP_BUDGET_MS
+            self.destroy()
+
+    def _set_icon(self, win):
+        # .ico files only load on Windows; elsewhere the window keeps the window manager's icon
+        try:
+            win.iconbitmap(ICON_PATH)
+        except tk.TclError:
+            pass
 
     # UI setup
     def _setup_style(self):
@@ -135,10 +1495,12 @@ class ConfigEditor(tk.Tk):
         style.configure("SideBar.TFrame", background="#25232A")
         style.configure("Round.TButton", background="#25232A", foreground=self.theme.get("editor_fg", "#D8D8D8"), borderwidth=0, padding=6)
         style.map("Round.TButton", background=[("active", "#3A3A4A")])
+        style.configure("ActiveTab.TButton", background="#3A3A4A", foreground=self.theme.get("editor_fg", "#D8D8D8"), borderwidth=0, padding=6)
         style.configure("TScrollbar", troughcolor=self.theme.get("scrollbar_trough"), background=self.theme.get("scrollbar_slider"),
                         arrowcolor=self.theme.get("editor_fg"), relief="flat", borderwidth=0)
         style.map("TScrollbar", background=[("active", self.theme.get("accent"))])
         style.configure("Dark.TEntry", fieldbackground=self.theme.get("ln_bg"), foreground=self.theme.get("editor_fg"), borderwidth=0)
+        style.configure("Status.TLabel", background=self.theme.get("ln_bg"), foreground=self.theme.get("ln_fg"), padding=(6,1))
 
     def _build_ui(self):
         toolbar = ttk.Frame(self, style="ToolBar.TFrame")
@@ -150,7 +1512,7 @@ class ConfigEditor(tk.Tk):
         fm.add_command(label="Save   Ctrl+S", command=self._save_file)
         fm.add_command(label="Save As", command=self._save_as_file)
         fm.add_separator()
-        fm.add_command(label="Exit", command=self.quit)
+        fm.add_command(label="Exit", command=self._on_close)
         file_mb["menu"] = fm
         file_mb.pack(side="left", padx=4, pady=4)
 
@@ -158,8 +1520,9 @@ class ConfigEditor(tk.Tk):
 
         lang_mb = ttk.Menubutton(toolbar, text="🧩 Language", style="Round.TButton")
         lm = tk.Menu(lang_mb, tearoff=0, bg="#25232A", fg=self.theme.get("editor_fg"))
-        lm.add_command(label="Scan configs/ folder", command=lambda: (self.config_manager.scan(), messagebox.showinfo("Scan", f"Found {len(self.config_manager.available)} config(s).")))
+        lm.add_command(label="Scan config/ folder", command=lambda: (self.config_manager.scan(), messagebox.showinfo("Scan", f"Found {len(self.config_manager.available)} config(s).")))
         lm.add_command(label="Load language JSON...", command=self._menu_load_language)
+        lm.add_command(label="Toggle minified mode", command=lambda: self._set_degraded(not self._degraded))
         lang_mb["menu"] = lm
         lang_mb.pack(side="left", padx=4, pady=4)
 
@@ -171,14 +1534,20 @@ class ConfigEditor(tk.Tk):
         theme_mb.pack(side="right", padx=4, pady=4)
 
         ttk.Button(toolbar, text="🔎 Find", style="Round.TButton", command=self._open_find).pack(side="right", padx=4, pady=4)
+        ttk.Button(toolbar, text="🗃 Find in Files", style="Round.TButton", command=self._open_find_in_files).pack(side="right", padx=4, pady=4)
         ttk.Button(toolbar, text="A+", style="Round.TButton", command=self._increase_font).pack(side="right", padx=4, pady=4)
         ttk.Button(toolbar, text="A-", style="Round.TButton", command=self._decrease_font).pack(side="right", padx=4, pady=4)
 
-        ttk.Separator(self, orient="horizontal").grid(row=1, column=0, columnspan=6, sticky="ew", pady=2)
+        # tab bar
+        self.tabbar = ttk.Frame(self, style="ToolBar.TFrame")
+        self.tabbar.grid(row=1, column=0, columnspan=6, sticky="ew", pady=2)
 
         # file list
         self.filebar_container = ttk.Frame(self, style="SideBar.TFrame")
         self.filebar_container.grid(row=2, column=0, sticky="ns")
+        self.file_filter = ttk.Entry(self.filebar_container, style="Dark.TEntry")
+        self.file_filter.pack(fill="x", padx=4, pady=(4,0))
+        self.file_filter.bind("<KeyRelease>", lambda e: self._render_file_list())
         self.file_list = tk.Listbox(self.filebar_container, bg=self.theme.get("ln_bg"), fg=self.theme.get("editor_fg"), selectbackground=self.theme.get("accent"), selectforeground=self.theme.get("editor_bg"), font=("Consolas",11), bd=0, highlightthickness=0)
         self.file_list.pack(fill="both", expand=True, padx=4, pady=4)
         self.file_list.bind("<Double-1>", self._open_selected_file)
@@ -186,46 +1555,61 @@ class ConfigEditor(tk.Tk):
         ttk.Separator(self, orient="vertical").grid(row=2, column=1, sticky="ns", padx=2)
         ttk.Separator(self, orient="vertical").grid(row=2, column=3, sticky="ns", padx=2)
 
-        # line numbers
-        self.linenumbers = tk.Text(self, width=4, bg=self.theme.get("ln_bg"), fg=self.theme.get("ln_fg"), font=("Consolas",12), bd=0, padx=4, takefocus=0, wrap="none", state="disabled", highlightthickness=0)
+        # line numbers: a canvas holding only the numbers of the lines on screen
+        self.linenumbers = tk.Canvas(self, width=40, bg=self.theme.get("ln_bg"), bd=0, takefocus=0, highlightthickness=0)
         self.linenumbers.grid(row=2, column=2, sticky="ns")
 
-        # editor area
-        self.text_area = tk.Text(self, font=("Consolas",12), undo=True, bg=self.theme.get("editor_bg"), fg=self.theme.get("editor_fg"), insertbackground=self.theme.get("cursor"), selectbackground=self.theme.get("accent"), selectforeground=self.theme.get("editor_bg"), wrap="none", bd=0, relief="flat", padx=6, pady=4)
+        # editor area; every document gets its own text widget from _new_text, sharing one font object
+        self._font = tkfont.Font(font=("Consolas",12))
+        self.text_area = self._new_text()
         self.text_area.grid(row=2, column=4, sticky="nsew")
         self.rowconfigure(2, weight=1)
         self.columnconfigure(4, weight=1)
 
-        # base tags: ensure they exist
-        base_tags = ["control","definition","import","exception","logic","constants","builtin","digits","symbols","paran",
-                     "class_name","func_name","var_name","string","comment","module","self","self_attr", "fstring_prefix"]
-        for t in base_tags:
-            # configure with theme or fallback
-            color = self.theme.get(t, DEFAULT_THEME.get(t, "#FFFFFF"))
-            self.text_area.tag_configure(t, foreground=color)
-        self.text_area.tag_configure("search", background="#44475A", foreground="#F8F8F2")
-        self.text_area.tag_configure("active_line", background="#272728")
-
         # scrollbars
         vs = ttk.Scrollbar(self, orient="vertical", style="TScrollbar", command=self._on_vscroll)
         vs.grid(row=2, column=5, sticky="ns")
-        self.text_area.config(yscrollcommand=vs.set)
-        self.linenumbers.config(yscrollcommand=vs.set)
+        self.vscroll = vs
 
-        hs = ttk.Scrollbar(self, orient="horizontal", style="TScrollbar", command=self.text_area.xview)
+        hs = ttk.Scrollbar(self, orient="horizontal", style="TScrollbar", command=lambda *a: self.text_area.xview(*a))
         hs.grid(row=3, column=2, columnspan=3, sticky="ew")
-        self.text_area.config(xscrollcommand=hs.set)
+        self.hscroll = hs
 
-        # events
-        self.text_area.bind("<KeyRelease>", lambda e: (self._schedule_highlight(), self._highlight_current_line()))
-        self.text_area.bind("<ButtonRelease-1>", lambda e: self._highlight_current_line())
-        self.text_area.bind("<MouseWheel>", self._on_mousewheel)
-        self.text_area.bind("<Button-4>", self._on_mousewheel)
-        self.text_area.bind("<Button-5>", self._on_mousewheel)
+        # status line
+        self.status = ttk.Label(self, text="", style="Status.TLabel", anchor="w")
+        self.status.grid(row=4, column=0, columnspan=6, sticky="ew")
+        self.mode_label = ttk.Label(self, text="", style="Status.TLabel", anchor="e")
+        self.mode_label.grid(row=4, column=4, columnspan=2, sticky="e")
 
-        # find dialog state & font object
+        # find dialog state
         self.search_win = None
-        self._font = tkfont.Font(font=self.text_area["font"])
+
+    def _new_text(self):
+        ta = tk.Text(self, font=self._font, undo=True, bg=self.theme.get("editor_bg"), fg=self.theme.get("editor_fg"), insertbackground=self.theme.get("cursor"), selectbackground=self.theme.get("accent"), selectforeground=self.theme.get("editor_bg"), wrap="none", bd=0, relief="flat", padx=6, pady=4)
+
+        # base tags: ensure they exist
+        base_tags = ["control","definition","import","exception","logic","constants","builtin","digits","symbols","paran",
+                     "class_name","func_name","var_name","string","comment","module","self","self_attr", "fstring_prefix"]
+        for t in base_tags:
+            # configure with theme or fallback
+            color = self.theme.get(t, DEFAULT_THEME.get(t, "#FFFFFF"))
+            ta.tag_configure(t, foreground=color)
+        ta.tag_configure("word_occurrence", background="#323236")
+        ta.tag_configure("search_hit", background="#34363F")
+        ta.tag_configure("search", background="#44475A", foreground="#F8F8F2")
+        ta.tag_configure("active_line", background="#272728")
+        ta.tag_configure("bracket_match", background="#3E4451", foreground="#FFD866")
+        ta.config(yscrollcommand=self._on_text_yscroll, xscrollcommand=lambda *a: self.hscroll.set(*a))
+
+        # events
+        ta.bind("<KeyRelease>", lambda e: (self._schedule_highlight(), self._update_decorations()))
+        ta.bind("<ButtonRelease-1>", lambda e: self._update_decorations())
+        ta.bind("<<Modified>>", self._on_modified)
+        ta.bind("<Configure>", lambda e: self._update_line_numbers())
+        ta.bind("<MouseWheel>", self._on_mousewheel)
+        ta.bind("<Button-4>", self._on_mousewheel)
+        ta.bind("<Button-5>", self._on_mousewheel)
+        return ta
 
     # ensure tags exist and set colors
     def ensure_tags(self, tags_iterable):
@@ -258,8 +1642,9 @@ class ConfigEditor(tk.Tk):
         # apply editor colorings
         try:
             self.configure(bg=self.editor_bg)
-            self.text_area.config(bg=self.editor_bg, fg=self.editor_fg, insertbackground=self.cursor, selectbackground=self.accent, selectforeground=self.editor_bg)
-            self.linenumbers.config(bg=self.ln_bg, fg=self.ln_fg)
+            self._apply_text_colors()
+            self.linenumbers.config(bg=self.ln_bg)
+            self._ln_drawn = None
             self.file_list.config(bg=self.ln_bg, fg=self.editor_fg, selectbackground=self.accent, selectforeground=self.editor_bg)
             self._setup_style()
         except Exception:
@@ -267,51 +1652,19 @@ class ConfigEditor(tk.Tk):
 
         self.ensure_tags(set(list(self.theme.keys())))
 
+    def _apply_text_colors(self):
+        self.text_area.config(bg=self.editor_bg, fg=self.editor_fg, insertbackground=self.cursor, selectbackground=self.accent, selectforeground=self.editor_bg)
+
     # load language config
     def load_language_config(self, cfg):
         try:
             if not isinstance(cfg, dict):
                 raise ValueError("Language config must be a dict")
-            # copy to avoid mutation
+            # copy to avoid mutation; results computed under the old config are stale
+            self._hl_gen += 1
             self.lang_config = dict(cfg)
-            ltype = self.lang_config.get("type", "regex")
-            self.lang_patterns = []
-            self.lang_keywords = {}
-
-            # compile regex patterns
-            if ltype == "regex":
-                for p in self.lang_config.get("patterns", []):
-                    regex = p.get("regex")
-                    tag = p.get("tag")
-                    group = int(p.get("group", 0)) if p.get("group", 0) else 0
-                    flags = 0
-                    fstr = p.get("flags", "") or ""
-                    if "i" in fstr: flags |= re.IGNORECASE
-                    if "m" in fstr: flags |= re.MULTILINE
-                    if "s" in fstr: flags |= re.DOTALL
-                    try:
-                        cre = re.compile(regex, flags)
-                        self.lang_patterns.append((tag, cre, group))
-                    except Exception as ex:
-                        print("[load_language_config] bad regex:", regex, ex)
-                for tag, words in self.lang_config.get("keywords", {}).items():
-                    if isinstance(words, (list,tuple,set)):
-                        self.lang_keywords[tag] = set(words)
-            elif ltype == "python":
-                # python: optional keywords as fallback
-                kws = self.lang_config.get("keywords", {})
-                for tag, words in kws.items():
-                    if isinstance(words, (list,tuple,set)):
-                        self.lang_keywords[tag] = set(words)
-
-            # add tags for keywords & pattern tags and base tags
-            tags_used = set(self.lang_keywords.keys())
-            for tpl in self.lang_patterns:
-                tags_used.add(tpl[0])
-            base = {"control","definition","import","exception","logic","constants","builtin","digits","symbols","paran",
-                    "class_name","func_name","var_name","string","comment","module","self","self_attr", "fstring_prefix"}
-            tags_used.update(base)
-            self.ensure_tags(tags_used)
+            self.highlighter = self.lang_cache.get(self.lang_config, Highlighter)
+            self.ensure_tags(self.highlighter.tags)
 
             if "theme" in self.lang_config and isinstance(self.lang_config["theme"], dict):
                 self.apply_theme(self.lang_config["theme"], merge=True)
@@ -321,238 +1674,646 @@ class ConfigEditor(tk.Tk):
             messagebox.showerror("Error", f"Failed to load language config: {ex}")
 
     # highlight engine
-    def _get_token_spans(self, txt):
-        string_spans, comment_spans = [], []
-        if not txt:
-            return string_spans, comment_spans
-        lines = txt.splitlines(keepends=True)
-        offsets = []; off = 0
-        for ln in lines:
-            offsets.append(off); off += len(ln)
-        def abs_index(pos):
-            r,c = pos
-            if r-1 >= len(offsets): return len(txt)
-            return offsets[r-1] + c
-        try:
-            for tok in tokenize.generate_tokens(io.StringIO(txt).readline):
-                if tok.type == tokenize.STRING:
-                    s = abs_index(tok.start); e = abs_index(tok.end)
-                    string_spans.append((s,e))
-                elif tok.type == tokenize.COMMENT:
-                    s = abs_index(tok.start); e = abs_index(tok.end)
-                    comment_spans.append((s,e))
-        except (tokenize.TokenError, IndentationError):
-            pass
-        return string_spans, comment_spans
-
-    def _clear_syntax_tags(self):
+    def _clear_syntax_tags(self, *ranges):
+        ranges = ranges or ("1.0", tk.END)
         for tag in list(self.text_area.tag_names()):
-            if tag in ("search","active_line"): continue
-            self.text_area.tag_remove(tag, "1.0", tk.END)
+            if tag in ("search","search_hit") or tag in DECORATION_TAGS: continue
+            self.text_area.tag_remove(tag, *ranges)
+            self.tag_calls += 1
+            self.tag_mutations += len(ranges) // 2
 
     def _highlight_and_number(self):
+        self._cancel_lazy()
+        if self._degraded:
+            self._update_line_numbers()
+            self._highlight_job = None
+            return
+        if self.background_highlight:
+            return self._highlight_background()
         txt = self.text_area.get("1.0", "end-1c")
         lang_type = (self.lang_config.get("type") if self.lang_config else "python")
-        string_spans, comment_spans = (self._get_token_spans(txt) if lang_type == "python" else ([],[]))
-
-        def in_span(i, spans):
-            return any(s <= i < e for s,e in spans)
-
-        self._clear_syntax_tags()
-
-        # strings & comments first
-        for s,e in string_spans: self.text_area.tag_add("string", f"1.0+{s}c", f"1.0+{e}c")
-        for s,e in comment_spans: self.text_area.tag_add("comment", f"1.0+{s}c", f"1.0+{e}c")
+        lines = txt.split("\n")
+        self._align_rows(lines)
 
         if lang_type == "python":
             self._tokenize_and_apply_structures(txt)
         else:
-            # regex patterns
-            for tag, cre, group in self.lang_patterns:
-                for m in cre.finditer(txt):
-                    if group and m.lastindex and group <= m.lastindex:
-                        s, e = m.start(group), m.end(group)
-                    else:
-                        s, e = m.start(), m.end()
-                    if in_span(s, string_spans) or in_span(s, comment_spans): continue
-                    self.text_area.tag_add(tag, f"1.0+{s}c", f"1.0+{e}c")
-            # keywords
-            for tag, words in self.lang_keywords.items():
-                if not words: continue
-                pattern = r"\b(?:" + "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r")\b"
-                for m in re.finditer(pattern, txt):
-                    s, e = m.start(), m.end()
-                    if in_span(s, string_spans) or in_span(s, comment_spans): continue
-                    self.text_area.tag_add(tag, f"1.0+{s}c", f"1.0+{e}c")
-            # fallback constructs
-            for m in self._pat_class.finditer(txt):
-                i = m.start(1)
-                if in_span(i, string_spans) or in_span(i, comment_spans): continue
-                self.text_area.tag_add("class_name", f"1.0+{i}c", f"1.0+{m.end(1)}c")
-            for m in self._pat_def.finditer(txt):
-                i = m.start(1)
-                if in_span(i, string_spans) or in_span(i, comment_spans): continue
-                self.text_area.tag_add("func_name", f"1.0+{i}c", f"1.0+{m.end(1)}c")
-            for m in self._pat_call.finditer(txt):
-                i = m.start(1)
-                if in_span(i, string_spans) or in_span(i, comment_spans): continue
-                self.text_area.tag_add("func_name", f"1.0+{i}c", f"1.0+{m.end(1)}c")
-            for m in self._pat_var.finditer(txt):
-                i = m.start(1)
-                if in_span(i, string_spans) or in_span(i, comment_spans): continue
-                self.text_area.tag_add("var_name", f"1.0+{i}c", f"1.0+{m.end(1)}c")
+            spans = self._regex_spans(txt)
+            offs = line_offsets(lines)
+            self._retag_region(0, len(lines), [(tag, offset_rc(offs, s), offset_rc(offs, e)) for tag, s, e in spans])
+            self._hl_spans = spans
 
-        # update line numbers
-        total = int(self.text_area.index("end-1c").split(".")[0])
-        nums = "\n".join(str(i) for i in range(1, total+1)) + "\n"
-        self.linenumbers.config(state="normal")
-        self.linenumbers.delete("1.0", tk.END)
-        self.linenumbers.insert("1.0", nums)
-        self.linenumbers.config(state="disabled")
+        self._hl_lines = lines
+        self._hl_cfg = self.lang_config
+        self._cache_spans(list(self._hl_rows), self._hl_sync if lang_type == "python" else None, self._hl_spans)
+        self._update_line_numbers()
 
         self._highlight_job = None
-        self._highlight_current_line()
+        self._update_decorations()
+
+    # diff-based tagging: the widget's tags are recorded per line, and a pass only touches lines that differ
+    def _align_rows(self, lines, edit=None):
+        # carry the per-line record over the edits made since it was taken; lines whose text changed lose their
+        # record. edit may pass (old_lines, a, b) from an earlier changed_line_range call
+        rows, old = self._hl_rows, self._hl_rows_lines
+        if rows is None or old is None:
+            rows = [None]*len(lines)
+        elif old is not lines:
+            a, b = edit[1:] if edit and edit[0] is old else changed_line_range(old, lines)
+            rows = rows[:a] + [None]*(len(lines)-b-a) + rows[len(old)-b:]
+        self._hl_rows, self._hl_rows_lines = rows, lines
+
+    def _retag_region(self, first, stop, spans):
+        # re-tag lines first..stop-1 (0-based) from spans whose 1-based (line, col) positions count from line first
+        self._apply_rows(first, spans_by_row(coalesce_spans(spans), stop - first))
+
+    def _apply_rows(self, first, rows):
+        # bring lines first.. in line with rows (per-line pieces from spans_by_row). lines whose pieces match the
+        # record are skipped, recorded lines get exact removes/adds, unrecorded lines are cleared first
+        held = self._hl_rows
+        clear, rem, add = [], {}, {}
+        def put(out, tag, r, c0, c1):
+            idx = out.setdefault(tag, [])
+            if c0 == 0 and idx and idx[-1] == f"{r}.0":
+                # continues a piece that ran through the previous line's newline
+                idx[-1] = f"{r+1}.0" if c1 < 0 else f"{r}.{c1}"
+            else:
+                idx += (f"{r}.{c0}", f"{r+1}.0" if c1 < 0 else f"{r}.{c1}")
+        for i, new in enumerate(rows):
+            old = held[first+i]
+            if new == old: continue
+            r = first + i + 1
+            if old is None:
+                if clear and clear[-1] == f"{r}.0": clear[-1] = f"{r+1}.0"
+                else: clear += (f"{r}.0", f"{r+1}.0")
+                old = ()
+            for piece in sorted(set(old).difference(new)): put(rem, piece[0], r, piece[1], piece[2])
+            for piece in new:
+                if piece not in old: put(add, piece[0], r, piece[1], piece[2])
+        if clear:
+            self._clear_syntax_tags(*clear)
+        for tag, idx in rem.items():
+            self.text_area.tag_remove(tag, *idx)
+            self.tag_calls += 1; self.tag_mutations += len(idx) // 2
+        for tag, idx in add.items():
+            self.text_area.tag_add(tag, *idx)
+            self.tag_calls += 1; self.tag_mutations += len(idx) // 2
+        held[first:first+len(rows)] = rows
+
+    # background pass: tokenize a snapshot on the worker thread, apply its spans from the Tk thread
+    def _highlight_background(self):
+        # clearing the modified flag first makes any <<Modified>> still queued from earlier edits a no-op
+        self.text_area.edit_modified(False)
+        self._hl_gen += 1
+        txt = self.text_area.get("1.0", "end-1c")
+        lang_type = (self.lang_config.get("type") if self.lang_config else "python")
+        self._hl_lines = None
+        self._hl_pending = self._hl_gen
+        self._hl_worker.submit(self._hl_gen, self.highlighter, txt, self.regex_scanner)
+        if not self._poll_job:
+            self._poll_job = self.after(HL_POLL_MS, self._poll_highlight)
+        self._update_line_numbers()
+        self._highlight_job = None
+        self._update_decorations()
 
-    def _tokenize_and_apply_structures(self, txt):
-        if not txt: return
-        lines = txt.splitlines(keepends=True)
-        offsets = []
-        off = 0
-        for ln in lines:
-            offsets.append(off); off += len(ln)
-        def abs_idx(pos):
-            r,c = pos
-            if r-1 >= len(offsets): return len(txt)
-            return offsets[r-1] + c
+    def _poll_highlight(self):
+        self._poll_job = None
         try:
-            tokens = list(tokenize.generate_tokens(io.StringIO(txt).readline))
-        except Exception:
-            tokens = []
-        n = len(tokens)
-        def next_sig(i):
-            j = i+1
-            while j < n:
-                if tokens[j].type not in (tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
-                    return j
-                j += 1
-            return None
-
-        for i, tok in enumerate(tokens):
-            ttype, tstr = tok.type, tok.string
-            sidx = abs_idx(tok.start); eidx = abs_idx(tok.end)
+            while True:
+                gen, res = self._hl_worker.results.get_nowait()
+                if gen == self._hl_pending: self._hl_pending = None
+                if gen == self._hl_gen and not isinstance(res, Exception):
+                    self._hl_apply = {"gen": gen, "res": res, "k": 0}
+        except queue.Empty:
+            pass
+        ap = self._hl_apply
+        if ap and ap["gen"] != self._hl_gen:
+            # the buffer moved on; a partly applied result leaves the tags unknown, so force a full pass next time
+            if ap["k"]: self._hl_lines = self._hl_rows = None
+            self._hl_apply = ap = None
+        if ap:
+            rows, k = ap["res"]["rows"], ap["k"]
+            if not k: self._align_rows(ap["res"]["lines"])
+            j = k; n = 0
+            while j < len(rows) and n < HL_APPLY_BATCH:
+                n += len(rows[j]) + 1; j += 1
+            self._apply_rows(k, rows[k:j])
+            ap["k"] = k = j
+            if k >= len(rows):
+                res = ap["res"]
+                if "sync" in res: self._hl_sync = res["sync"]
+                else: self._hl_spans = res["regex"]
+                self._hl_lines = res["lines"]
+                self._hl_cfg = self.lang_config
+                self._hl_apply = None
+                if not res.get("cached"): self._cache_spans(res["rows"], res.get("sync"), res.get("regex"))
+        if self._hl_pending is not None or self._hl_apply:
+            self._poll_job = self.after(1 if self._hl_apply else HL_POLL_MS, self._poll_highlight)
+
+    def _on_modified(self, event=None):
+        # every buffer edit moves the edit generation on, which makes in-flight highlight results stale
+        if self.text_area.edit_modified():
+            self._hl_gen += 1
+            self._span_src = None
+            self.text_area.edit_modified(False)
+            if self._find: self._schedule_find()
+            if self.minified_mode and self._degraded is None and not self._stream and not self._viewer:
+                # a paste can make any line pathological; the cursor's line is the one an edit just touched
+                if int(self.text_area.index("insert lineend").split(".")[1]) >= MINIFIED_COLS: self._set_degraded(True)
+            doc = self._doc
+            if doc and not self._viewer and not self._stream:
+                doc.edits += 1
+                if not doc.dirty:
+                    doc.dirty = True
+                    self._render_tabs()
+
+    # incremental pass: re-tag only the lines changed since the last pass
+    def _highlight_incremental(self):
+        old = self._hl_lines
+        if old is None and self._hl_gen in (self._hl_pending, self._hl_apply and self._hl_apply["gen"]):
+            # a background pass over the current text is still on its way
+            self._highlight_job = None
+            return
+        if old is None or self._hl_cfg is not self.lang_config:
+            return self._highlight_and_number()
+        txt = self.text_area.get("1.0", "end-1c")
+        lines = txt.split("\n")
+        a, b = changed_line_range(old, lines)
+        if a == len(old) == len(lines):
+            self._highlight_job = None
+            return
+        lang_type = (self.lang_config.get("type") if self.lang_config else "python")
+        if lang_type == "python" and self._hl_sync is None:
+            return self._highlight_and_number()
+        if self.background_highlight and max(len(old), len(lines)) - b - a > HL_SYNC_LINES:
+            # a big paste, an undo or a replace-all: the worker re-highlights rather than the Tk thread
+            return self._highlight_background()
+        self._align_rows(lines, (old, a, b))
+        if lang_type == "python":
+            # splice the resync flags, then re-tokenize from the nearest clean line before the damage
+            # until the tokenizer reaches a line that was clean before and is clean again
+            dmg_end = len(lines) - b
+            sync = self._hl_sync[:a] + bytearray(dmg_end - a) + self._hl_sync[len(old)-b:]
+            first = max(sync.rfind(1, 0, a+1), 0)
+            # an unclosed bracket leaves no clean line to stop at: past HL_SYNC_LINES the worker re-tokenizes
+            # the whole buffer instead
+            end = min(first + HL_SYNC_LINES, len(lines)) if self.background_highlight else None
+            if end is not None and dmg_end > end:
+                return self._highlight_background()
+            toks, stop, clean = tokenize_lines(lines, first, sync, dmg_end, end=end, cols=self.highlighter.max_cols)
+            sync[first:stop] = bytes(stop - first)
+            for r in clean: sync[r] = 1
+            self._hl_sync = sync
+            self._retag_region(first, stop, self._structure_spans(toks))
+            if stop == end < len(lines):
+                return self._highlight_background()
+        else:
+            lo, hi, win, k0, k1, delta = self._regex_rescan(txt, lines, old, a, b)
+            # re-tag the window's lines from its new spans; the spans after it only move
+            lr = txt.count("\n", 0, lo); hr = lr + txt.count("\n", lo, hi) + (hi > len(txt))
+            woffs = line_offsets(lines[lr:hr])
+            self._retag_region(lr, hr, [(tag, offset_rc(woffs, s - lo), offset_rc(woffs, e - lo)) for tag, s, e in win])
+            old_spans = self._hl_spans
+            self._hl_spans = old_spans[:k0] + win + [(tag, s + delta, e + delta) for tag, s, e in old_spans[k1:]]
+
+        self._hl_lines = lines
+        if len(lines) != len(old):
+            self._update_line_numbers()
+        self._highlight_job = None
 
-            if ttype == tokenize.STRING:
-                # Handle f-string prefix
-                if tstr.startswith(('f"', "f'", 'F"', "F'")):
-                    self.text_area.tag_add("fstring_prefix", f"1.0+{sidx}c", f"1.0+{sidx+1}c")
-                    self.text_area.tag_add("string", f"1.0+{sidx+1}c", f"1.0+{eidx}c")
+    def _regex_rescan(self, txt, lines, old, a, b):
+        # rescan the regex spans around lines a..len(lines)-b, the part that differs from old. the scan starts at a
+        # line start HL_RESCAN_LINES before the damage that no old span crosses, so a comment or string the edit
+        # closes is found, and ends at the first line start after it that neither the old nor the new spans cross:
+        # the text and the scan agree from there on. returns the window [lo, hi) in txt, its new spans, the range
+        # [k0, k1) of old spans it replaces and the offset shift of the spans after it
+        spans = self._hl_spans
+        start = lambda sp: sp[1]
+        def reaching(k, lo):
+            # the span reaching furthest among the few before index k; spans barely overlap, so a short look will do
+            return max(spans[max(k - 8, lo):k], key=lambda sp: sp[2], default=None)
+        p = sum(map(len, lines[:a])) + a
+        r0 = max(a - HL_RESCAN_LINES, 0)
+        x = p - sum(map(len, lines[r0:a])) - (a - r0)
+        while True:
+            k0 = bisect.bisect_left(spans, x, key=start)
+            o = reaching(k0, 0)
+            if o is None or o[2] <= x: break
+            x = txt.rfind("\n", 0, o[1]) + 1
+        delta = len(txt) - (sum(map(len, old)) + len(old) - 1)
+        reach = max(x, len(txt) + 1 - sum(map(len, lines[len(lines) - b:])) - b)
+        long_lines = max(map(len, lines)) > self.highlighter.max_cols
+        it = self.highlighter.iter_regex_spans(txt, self.regex_scanner, x, long_lines)
+        sp = next(it, None)
+        win = []
+        while True:
+            y = reach if reach == 0 or reach > len(txt) or txt[reach - 1] == "\n" else txt.find("\n", reach) + 1 or len(txt) + 1
+            if sp is not None and sp[1] < y:
+                win.append(sp); reach = max(reach, sp[2])
+                sp = next(it, None)
+                continue
+            if y > len(txt):
+                return x, y, win, k0, len(spans), delta
+            k1 = bisect.bisect_left(spans, y - delta, k0, key=start)
+            o = reaching(k1, k0)
+            if o is None or o[2] <= y - delta:
+                return x, y, win, k0, k1, delta
+            reach = o[2] + delta
+
+    # lazy pass: paint the viewport first, then fill in the rest of the buffer across after() ticks
+    def _highlight_lazy(self):
+        self._cancel_lazy()
+        txt = self.text_area.get("1.0", "end-1c")
+        lines = txt.split("\n")
+        lang_type = (self.lang_config.get("type") if self.lang_config else "python")
+        self._hl_lines = self._hl_rows = None
+        self._lazy = {"type": lang_type, "txt": txt, "lines": lines, "row": 0, "sync": bytearray(len(lines)),
+                      "iter": None, "spans": [], "k": 0, "offs": None, "painted": [], "dirty": False, "chunks": []}
+        self._clear_syntax_tags()
+        self._update_line_numbers()
+        self._highlight_viewport()
+        self._lazy_job = self.after(1, self._lazy_tick)
+        self._highlight_job = None
+        self._update_decorations()
+
+    def _cancel_lazy(self):
+        if self._lazy_job:
+            self.after_cancel(self._lazy_job)
+        self._lazy = None; self._lazy_job = None
+
+    def _visible_rows(self):
+        # 0-based [top, bottom) rows currently on screen
+        top = int(self.text_area.index("@0,0").split(".")[0]) - 1
+        h = self.text_area.winfo_height()
+        bot = int(self.text_area.index(f"@0,{h}").split(".")[0]) if h > 1 else top + 50
+        return top, bot
+
+    def _lazy_refresh(self):
+        # pick up edits made while a python fill is running; the fill restarts at the last clean line before them
+        st = self._lazy
+        if not st["dirty"]: return
+        st["dirty"] = False
+        old = st["lines"]
+        lines = self.text_area.get("1.0", "end-1c").split("\n")
+        a, b = changed_line_range(old, lines)
+        sync = st["sync"]
+        st["sync"] = sync = sync[:a] + bytearray(len(lines) - b - a) + sync[len(old)-b:]
+        if a < st["row"]:
+            st["row"] = max(sync.rfind(1, 0, a+1), 0)
+        st["lines"] = lines
+        if len(lines) != len(old):
+            self._update_line_numbers()
+
+    def _highlight_viewport(self):
+        # provisional highlight of the visible rows (plus a margin), ahead of the background fill
+        st = self._lazy
+        if not st: return
+        if st["type"] == "python": self._lazy_refresh()
+        lines = st["lines"]
+        top, bot = self._visible_rows()
+        top = max(top - LAZY_MARGIN, 0); bot = min(bot + LAZY_MARGIN, len(lines))
+        if st["type"] == "python":
+            if bot <= st["row"]: return
+            first = st["row"] if top <= st["row"] else guess_sync_line(lines, top)
+            toks, stop, _ = tokenize_lines(lines, first, limit=bot, end=min(bot + LAZY_CHUNK, len(lines)), cols=self.highlighter.max_cols)
+            self._clear_syntax_tags(f"{first+1}.0", f"{stop+1}.0")
+            self._tag_spans(self._structure_spans(toks), first)
+        else:
+            if any(a <= top and bot <= b for a, b in st["painted"]): return
+            self._clear_syntax_tags(f"{top+1}.0", f"{bot+1}.0")
+            self._tag_offset_spans(self._regex_spans("\n".join(lines[top:bot])), line_offsets(lines[top:bot]), top)
+            st["painted"].append((top, bot))
+
+    def _lazy_tick(self):
+        st = self._lazy
+        if not st: return
+        deadline = time.perf_counter() + LAZY_SLICE_MS/1000
+        if st["type"] == "python":
+            self._lazy_refresh()
+            lines, sync = st["lines"], st["sync"]
+            while st["row"] < len(lines) and time.perf_counter() < deadline:
+                first = st["row"]
+                toks, stop, clean = tokenize_lines(lines, first, limit=first + LAZY_CHUNK, cols=self.highlighter.max_cols)
+                self._clear_syntax_tags(f"{first+1}.0", f"{stop+1}.0")
+                spans = self._structure_spans(toks)
+                self._tag_spans(spans, first)
+                if self._span_src: st["chunks"].append((first, stop, spans))
+                for r in clean: sync[r] = 1
+                st["row"] = stop
+            done = st["row"] >= len(lines)
+        else:
+            # scan the whole text, then tag the collected spans, both in time slices
+            spans = st["spans"]
+            if st["iter"] is None:
+                st["iter"] = self.highlighter.iter_regex_spans(st["txt"], self.regex_scanner)
+            if st["offs"] is None:
+                for n, sp in enumerate(st["iter"]):
+                    spans.append(sp)
+                    if n % 256 == 255 and time.perf_counter() >= deadline: break
                 else:
-                    self.text_area.tag_add("string", f"1.0+{sidx}c", f"1.0+{eidx}c")
-            elif ttype == tokenize.COMMENT:
-                self.text_area.tag_add("comment", f"1.0+{sidx}c", f"1.0+{eidx}c")
-            elif ttype == tokenize.NAME:
-                if tstr == "def":
-                    j = next_sig(i)
-                    if j and tokens[j].type == tokenize.NAME:
-                        fn_s = abs_idx(tokens[j].start); fn_e = abs_idx(tokens[j].end)
-                        self.text_area.tag_add("func_name", f"1.0+{fn_s}c", f"1.0+{fn_e}c")
-                        # params
-                        k = j+1
-                        while k < n and tokens[k].string != "(":
-                            k += 1
-                        if k < n and tokens[k].string == "(":
-                            depth = 0; m = k
-                            while m < n:
-                                tt = tokens[m]
-                                if tt.string == "(":
-                                    depth += 1
-                                elif tt.string == ")":
-                                    depth -= 1
-                                    if depth == 0: break
-                                if depth > 0 and tt.type == tokenize.NAME:
-                                    ns = abs_idx(tt.start); ne = abs_idx(tt.end)
-                                    self.text_area.tag_add("var_name", f"1.0+{ns}c", f"1.0+{ne}c")
-                                m += 1
-                    continue
-                if tstr == "class":
-                    j = next_sig(i)
-                    if j and tokens[j].type == tokenize.NAME:
-                        cs = abs_idx(tokens[j].start); ce = abs_idx(tokens[j].end)
-                        self.text_area.tag_add("class_name", f"1.0+{cs}c", f"1.0+{ce}c")
-                    continue
-                if tstr == "import":
-                    j = next_sig(i)
-                    while j and tokens[j].type != tokenize.NEWLINE and tokens[j].string != ";":
-                        if tokens[j].type == tokenize.NAME:
-                            start_pos = abs_idx(tokens[j].start); end_pos = abs_idx(tokens[j].end)
-                            k = j+1
-                            while k+1 < n and tokens[k].string == "." and tokens[k+1].type == tokenize.NAME:
-                                end_pos = abs_idx(tokens[k+1].end); k += 2
-                            self.text_area.tag_add("module", f"1.0+{start_pos}c", f"1.0+{end_pos}c")
-                            j = k
-                        else:
-                            j = next_sig(j)
-                    continue
-                if tstr == "from":
-                    j = next_sig(i)
-                    if j and tokens[j].type == tokenize.NAME:
-                        start_pos = abs_idx(tokens[j].start); end_pos = abs_idx(tokens[j].end)
-                        k = j+1
-                        while k+1 < n and tokens[k].string == "." and tokens[k+1].type == tokenize.NAME:
-                            end_pos = abs_idx(tokens[k+1].end); k += 2
-                        self.text_area.tag_add("module", f"1.0+{start_pos}c", f"1.0+{end_pos}c")
-                        # imported names
-                        l = k
-                        while l < n and tokens[l].string != "import": l += 1
-                        if l < n and tokens[l].string == "import":
-                            m = l+1
-                            while m < n and tokens[m].type != tokenize.NEWLINE and tokens[m].string != ";":
-                                if tokens[m].type == tokenize.NAME:
-                                    is_ = abs_idx(tokens[m].start); ie_ = abs_idx(tokens[m].end)
-                                    self.text_area.tag_add("module", f"1.0+{is_}c", f"1.0+{ie_}c")
-                                m += 1
-                    continue
-                if tstr == "self":
-                    if i+2 < n and tokens[i+1].string == "." and tokens[i+2].type == tokenize.NAME:
-                        attr = tokens[i+2]; a_s = abs_idx(attr.start); a_e = abs_idx(attr.end)
-                        self.text_area.tag_add("self", f"1.0+{sidx}c", f"1.0+{eidx}c")
-                        self.text_area.tag_add("self_attr", f"1.0+{a_s}c", f"1.0+{a_e}c")
-                    else:
-                        self.text_area.tag_add("self", f"1.0+{sidx}c", f"1.0+{eidx}c")
-                    continue
-                # call detection
-                nj = next_sig(i)
-                if nj and tokens[nj].type == tokenize.OP and tokens[nj].string == "(":
-                    self.text_area.tag_add("func_name", f"1.0+{sidx}c", f"1.0+{eidx}c")
-                    continue
-                # assignment
-                if nj and tokens[nj].type == tokenize.OP and tokens[nj].string == "=":
-                    self.text_area.tag_add("var_name", f"1.0+{sidx}c", f"1.0+{eidx}c")
-                    continue
-                # keywords from config
-                for tag, words in self.lang_keywords.items():
-                    if isinstance(words, (set, list, tuple)) and tstr in words:
-                        self.text_area.tag_add(tag, f"1.0+{sidx}c", f"1.0+{eidx}c")
-                        break
-    
+                    st["offs"] = line_offsets(st["lines"])
+            if st["offs"] is not None:
+                offs, k = st["offs"], st["k"]
+                while k < len(spans) and time.perf_counter() < deadline:
+                    self._tag_offset_spans(spans[k:k+HL_APPLY_BATCH], offs)
+                    k += HL_APPLY_BATCH
+                st["k"] = k
+            done = st["offs"] is not None and st["k"] >= len(spans)
+
+        if not done:
+            self._lazy_job = self.after(1, self._lazy_tick)
+            return
+        if st["type"] == "python":
+            self._hl_sync = st["sync"]
+        else:
+            self._lazy_reconcile(st)
+            self._hl_spans = st["spans"]
+        self._hl_lines = st["lines"]
+        self._hl_cfg = self.lang_config
+        self._lazy = None; self._lazy_job = None
+        self._cache_spans(lambda: self._lazy_rows(st), st["sync"] if st["type"] == "python" else None, st["spans"])
+
+    @staticmethod
+    def _lazy_rows(st):
+        # per-line pieces of a finished fill, as a full pass would have produced them; runs off the Tk thread
+        if st["type"] != "python":
+            offs = st["offs"]
+            spans = [(tag, offset_rc(offs, s), offset_rc(offs, e)) for tag, s, e in st["spans"]]
+            return spans_by_row(coalesce_spans(spans), len(st["lines"]))
+        rows = [()] * len(st["lines"])
+        for first, stop, spans in st["chunks"]:
+            rows[first:stop] = spans_by_row(coalesce_spans(spans), stop - first)
+        return rows
+
+    def _lazy_reconcile(self, st):
+        # provisional viewport tags may disagree with the full pass (e.g. a comment opened above the viewport);
+        # re-tag the painted rows from the final spans
+        merged = []
+        for a, b in sorted(st["painted"]):
+            if merged and a <= merged[-1][1]: merged[-1][1] = max(merged[-1][1], b)
+            else: merged.append([a, b])
+        if not merged: return
+        offs = st["offs"]; total = len(st["txt"])
+        starts = [offs[a] for a, b in merged]
+        ends = [offs[b] if b < len(offs) else total for a, b in merged]
+        for a, b in merged:
+            self._clear_syntax_tags(f"{a+1}.0", f"{b+1}.0")
+        keep = []
+        for sp in st["spans"]:
+            k = bisect.bisect_right(ends, sp[1])
+            if k < len(starts) and starts[k] < sp[2]: keep.append(sp)
+        self._tag_offset_spans(keep, offs)
+
+    def _on_text_yscroll(self, first, last):
+        if self._viewer:
+            self._viewer_scroll(first, last)
+        else:
+            self.vscroll.set(first, last)
+        self._update_line_numbers()
+        if self._find and self._find.gen == self._hl_gen: self._paint_find_hits()
+        if self._lazy:
+            if self._scroll_job: self.after_cancel(self._scroll_job)
+            self._scroll_job = self.after(30, lambda: (setattr(self, "_scroll_job", None), self._highlight_viewport()))
+        if self._deco and self._deco.get("word_occurrence", (0, None))[1]:
+            # occurrences are only marked on screen; follow the viewport while a word is being marked
+            if self._deco_job: self.after_cancel(self._deco_job)
+            self._deco_job = self.after(30, lambda: (setattr(self, "_deco_job", None), self._mark_occurrences()))
+
+    def _regex_spans(self, txt):
+        return self.highlighter.regex_spans(txt, self.regex_scanner)
+
+    def _update_line_numbers(self):
+        # only the visible lines are drawn, so the cost follows the viewport height rather than the file length
+        ta = self.text_area
+        total = int(ta.index("end-1c").split(".")[0])
+        base = self._viewer["base"] if self._viewer else 0
+        last = self._viewer["index"].count if self._viewer else total
+        width = self._font.measure("0" * max(3, len(str(last)))) + 12
+        if width != self._ln_width:
+            self._ln_width = width
+            self._ln_drawn = None
+            self.linenumbers.config(width=width)
+        rows = []
+        # a wrapped line can start above the viewport (a minified file is one long line), so the lines from
+        # the top to the bottom of the view are walked and only the starts that are on screen get a number
+        top = int(ta.index("@0,0").split(".")[0])
+        bottom = min(total, int(ta.index(f"@0,{ta.winfo_height()}").split(".")[0]))
+        for line in range(top, bottom + 1):
+            info = ta.dlineinfo(f"{line}.0")
+            if info is not None: rows.append((base + line, info[1]))
+        if rows == self._ln_drawn: return
+        self._ln_drawn = rows
+        self.linenumbers.delete("all")
+        for line, y in rows:
+            self.linenumbers.create_text(width - 6, y, anchor="ne", text=str(line), fill=self.ln_fg, font=self._font)
+
+    def _tokenize_and_apply_structures(self, txt):
+        lines = txt.split("\n")
+        tokens, _, clean = tokenize_lines(lines, cols=self.highlighter.max_cols)
+        self._hl_sync = bytearray(len(lines))
+        for r in clean: self._hl_sync[r] = 1
+        self._retag_region(0, len(lines), self._structure_spans(tokens))
+
+    def _tag_spans(self, spans, first=0):
+        # spans carry 1-based (line, col) positions relative to line `first`; one multi-range tag_add per tag
+        for tag, ranges in coalesce_spans(spans).items():
+            idx = []
+            for (sr, sc), (er, ec) in ranges:
+                idx.append(f"{sr+first}.{sc}"); idx.append(f"{er+first}.{ec}")
+            self.text_area.tag_add(tag, *idx)
+            self.tag_calls += 1; self.tag_mutations += len(ranges)
+
+    def _structure_spans(self, tokens):
+        return self.highlighter.structure_spans(tokens)
+
+    def _tag_offset_spans(self, spans, offs, first=0):
+        # same for character-offset spans, converted through the line offset table offs
+        self._tag_spans([(tag, offset_rc(offs, s), offset_rc(offs, e)) for tag, s, e in spans], first)
+
     # scheduling highlight
     def _schedule_highlight(self):
         if self._highlight_job:
             self.after_cancel(self._highlight_job)
-        self._highlight_job = self.after(200, self._highlight_and_number)
-
-    def _highlight_current_line(self, event=None):
-        self.text_area.tag_remove("active_line", "1.0", tk.END)
-        ls = self.text_area.index("insert linestart")
-        le = self.text_area.index("insert lineend +1c")
-        self.text_area.tag_add("active_line", ls, le)
+        if self._stream or self._degraded: return
+        if self._lazy and self._lazy["type"] == "python":
+            # the running fill picks up the edit itself; just repaint the viewport
+            self._lazy["dirty"] = True
+            job = lambda: (setattr(self, "_highlight_job", None), self._highlight_viewport())
+        elif self._lazy:
+            job = self._highlight_lazy
+        else:
+            job = self._highlight_incremental if self.incremental_highlight else self._highlight_and_number
+        self._highlight_job = self.after(200, job)
+
+    # minified mode: a buffer with pathological lines gets wrapped lines, no syntax highlighting and no cursor
+    # decorations beyond the active line, so Tk's layout and every keystroke stay cheap
+    def _set_degraded(self, on):
+        # on: True, False (off and kept off for this buffer) or None (off, but an edit may turn it back on)
+        was, self._degraded = bool(self._degraded), on
+        if bool(on) != was:
+            self.text_area.config(wrap="char" if on else "none")
+            if on:
+                if self._highlight_job:
+                    self.after_cancel(self._highlight_job)
+                    self._highlight_job = None
+                self._cancel_lazy()
+                self._hl_gen += 1
+                self._hl_pending = self._hl_apply = None
+                self._clear_syntax_tags()
+                self._hl_lines = self._hl_rows = None
+                self._update_decorations()
+            else:
+                self._highlight_and_number()
+        self._show_mode()
+
+    def _show_mode(self):
+        self.mode_label.config(text="Minified: highlighting off, long lines wrapped" if self._degraded else "")
+
+    # cursor decorations: each one remembers the regions it painted, between marks that follow edits, so a cursor
+    # move only clears those and paints the new ones, whatever the size of the buffer
+    def _update_decorations(self, event=None):
+        ta = self.text_area
+        self._decorate("active_line", [(ta.index("insert linestart"), ta.index("insert lineend +1c"))])
+        if self._degraded:
+            # lines can be megabytes long here; reading around the cursor on every move would not keep up
+            self._decorate("bracket_match", [])
+            self._decorate("word_occurrence", [])
+            return
+        self._decorate("bracket_match", self._match_bracket())
+        self._mark_occurrences()
+
+    def _decorate(self, tag, regions, key=None, cover=None):
+        # paint tag over regions, after clearing what it painted last time. cover, when given, is one region
+        # spanning all of them, remembered in their place
+        ta = self.text_area
+        if self._deco is None: self._deco = {}
+        held, _ = self._deco.get(tag, (0, None))
+        for k in range(held):
+            ta.tag_remove(tag, f"{tag}:{k}:s", f"{tag}:{k}:e")
+        keep = [cover] if cover and regions else regions
+        for k, (a, b) in enumerate(keep):
+            ta.mark_set(f"{tag}:{k}:s", a); ta.mark_gravity(f"{tag}:{k}:s", "left")
+            ta.mark_set(f"{tag}:{k}:e", b)
+        for k in range(len(keep), held):
+            ta.mark_unset(f"{tag}:{k}:s", f"{tag}:{k}:e")
+        if regions: ta.tag_add(tag, *[i for r in regions for i in r])
+        self._deco[tag] = (len(keep), key)
+
+    def _line_brackets(self, row, text):
+        # code brackets of line row (0-based), from the highlighter's per-line record while it is current for the
+        # line; otherwise (lazy fill, an edit the next pass has not seen yet) from the tags in the widget
+        rows, lines = self._hl_rows, self._hl_rows_lines
+        if rows is not None and row < len(rows) and rows[row] is not None and lines[row] == text:
+            return line_brackets(text, rows[row])
+        ta = self.text_area
+        return [(c, b) for c, b in line_brackets(text) if not NONCODE_TAGS.intersection(ta.tag_names(f"{row+1}.{c}"))]
+
+    def _match_bracket(self):
+        # the bracket just before the cursor (else just after it) and its partner, searched for at most
+        # BRACKET_SCAN_LINES lines away
+        ta = self.text_area
+        r, c = map(int, ta.index("insert").split("."))
+        if c > LONG_LINE_COLS or int(ta.index("insert lineend").split(".")[1]) > MINIFIED_COLS: return []
+        text = ta.get(f"{r}.0", f"{r}.end")
+        here = [(col, b) for col, b in self._line_brackets(r-1, text) if col in (c-1, c)]
+        if not here: return []
+        col, b = here[0]
+        other, step = BRACKET_PAIRS[b], (1 if b in "([{" else -1)
+        depth = 0
+        for row, text in self._lines_from(r, text, step):
+            marks = self._line_brackets(row-1, text)
+            if step < 0: marks.reverse()
+            for mc, mb in marks:
+                if row == r and (mc - col) * step < 0: continue
+                if mb == b: depth += 1
+                elif mb == other:
+                    depth -= 1
+                    if not depth: return [(f"{r}.{col}", f"{r}.{col+1}"), (f"{row}.{mc}", f"{row}.{mc+1}")]
+        return []
+
+    def _lines_from(self, r, text, step, block=200):
+        # (line, text) pairs from line r (whose text is given) onwards in direction step, read from the widget
+        # a block at a time, for at most BRACKET_SCAN_LINES lines
+        yield r, text
+        ta = self.text_area
+        last = int(ta.index("end-1c").split(".")[0])
+        end = min(r + BRACKET_SCAN_LINES, last) if step > 0 else max(r - BRACKET_SCAN_LINES, 1)
+        while r != end:
+            a, b = (r + 1, min(r + block, end)) if step > 0 else (max(r - block, end), r - 1)
+            lines = ta.get(f"{a}.0", f"{b}.end").split("\n")
+            rows = range(a, b + 1) if step > 0 else range(b, a - 1, -1)
+            for row in rows: yield row, lines[row - a]
+            r = rows[-1]
+
+    def _mark_occurrences(self):
+        # other occurrences of the identifier under the cursor, looked for on screen only
+        ta = self.text_area
+        r, c = map(int, ta.index("insert").split("."))
+        c0 = max(c - 100, 0)
+        text = ta.get(f"{r}.{c0}", f"{r}.{c + 100}")
+        word = next((m.group() for m in _WORD_RE.finditer(text) if m.start() <= c - c0 <= m.end()), "")
+        if len(word) < 2 or word[0].isdigit():
+            if self._deco and self._deco.get("word_occurrence", (0,))[0]: self._decorate("word_occurrence", [])
+            return
+        top, bot = self._visible_rows()
+        key = (word, top, bot, self._hl_gen)
+        if self._deco and self._deco.get("word_occurrence", (0, None))[1] == key: return
+        view = ta.get(f"{top+1}.0", f"{bot+1}.0")
+        found = []
+        for m in re.finditer(rf"(?<!\w){re.escape(word)}(?!\w)", view):
+            found.append((f"{top+1}.0+{m.start()}c", f"{top+1}.0+{m.end()}c"))
+            if len(found) >= OCCURRENCE_MAX: break
+        # the word itself is not an occurrence worth marking when it is the only one
+        if len(found) < 2: found = []
+        self._decorate("word_occurrence", found, key, (f"{top+1}.0", f"{bot+1}.0"))
 
     # file list & open/save
+    # the file bar is drawn from self.dir_model; only rows that differ from what is shown are replaced
     def _populate_file_list(self):
-        self.file_list.delete(0, tk.END)
-        for fn in sorted(os.listdir(".")):
-            if os.path.isfile(fn):
-                self.file_list.insert(tk.END, fn)
+        self.dir_model.check()
+        self._render_file_list()
+
+    def _poll_dir_changes(self):
+        changed = False
+        while True:
+            try:
+                self.dir_model.changed.get_nowait()
+                changed = True
+            except queue.Empty:
+                break
+        if changed: self._render_file_list()
+        self.after(WATCH_POLL_MS, self._poll_dir_changes)
+
+    def _file_tree_rows(self, rel="", depth=0):
+        rows = []
+        for name, is_dir in self.dir_model.listing(rel):
+            path = f"{rel}/{name}" if rel else name
+            if is_dir:
+                opened = path in self._expanded
+                rows.append((path, True, "  " * depth + ("▾ " if opened else "▸ ") + name + "/"))
+                if opened: rows += self._file_tree_rows(path, depth + 1)
+            else:
+                rows.append((path, False, "  " * depth + "  " + name))
+        return rows
+
+    def _render_file_list(self):
+        query = self.file_filter.get().strip()
+        if query:
+            scored = []
+            # the list is built off the Tk thread; until it is ready the filter shows nothing
+            for path in self.dir_model.cached_files() or ():
+                sc = fuzzy_score(query, path)
+                if sc is not None: scored.append((sc, path))
+            rows = [(path, False, path) for _, path in sorted(scored)[:500]]
+        else:
+            rows = self._file_tree_rows()
+        lines = [r[2] for r in rows]
+        old = self._file_lines
+        a, b = changed_line_range(old, lines)
+        if a < len(old) - b: self.file_list.delete(a, len(old) - b - 1)
+        if a < len(lines) - b: self.file_list.insert(a, *lines[a:len(lines) - b])
+        self._file_rows = [(r[0], r[1]) for r in rows]
+        self._file_lines = lines
 
     def _toggle_filebar(self):
         if self.filebar_container.winfo_viewable():
@@ -567,10 +2328,36 @@ class ConfigEditor(tk.Tk):
 
     def _open_selected_file(self, e):
         sel = self.file_list.curselection()
-        if sel: self._load_path(self.file_list.get(sel[0]))
+        if not sel or sel[0] >= len(self._file_rows): return
+        path, is_dir = self._file_rows[sel[0]]
+        if not is_dir:
+            self._load_path(path)
+            return
+        self._expanded ^= {path}
+        self._render_file_list()
+        self.file_list.selection_set(sel[0])
 
     def _load_path(self, path):
+        # a file that is already open just gets its tab back; anything else opens in a new tab
+        # unless the current one is an untouched, empty scratch buffer
+        for doc in self.docs:
+            if self._path_of(doc) and os.path.abspath(self._path_of(doc)) == os.path.abspath(path):
+                self._switch_to(doc)
+                return
+        if self.file_path or self._viewer or self._doc.dirty or self.text_area.index("end-1c") != "1.0":
+            self._new_tab()
+        self._read_into_doc(path)
+
+    def _read_into_doc(self, path):
+        self._cancel_stream()
+        self._close_viewer()
         try:
+            if os.path.getsize(path) >= VIEWER_MIN_BYTES:
+                self._open_viewer(path)
+                return
+            if os.path.getsize(path) >= STREAM_MIN_BYTES:
+                self._stream_open(path)
+                return
             with open(path, "r", encoding="utf-8") as fh:
                 txt = fh.read()
         except Exception as ex:
@@ -578,45 +2365,525 @@ class ConfigEditor(tk.Tk):
             return
         self.text_area.delete("1.0", tk.END)
         self.text_area.insert("1.0", txt)
+        self._finish_load(path, txt.count("\n"))
+
+    def _finish_load(self, path, newlines):
+        # the load itself is not an unsaved change
+        self._on_modified()
+        self.text_area.edit_reset()
+        self._doc.dirty = False
         self.file_path = path
+        self._render_tabs()
+        self.title(f"DamEdit — {os.path.basename(path)}")
         self._populate_file_list()
-        
+        saved = self._session_pending.pop(os.path.abspath(path), None)
+        cfg = self._session_language(saved.get("language")) if saved else None
+        if cfg:
+            self.load_language_config(cfg)
+        else:
+            self._load_language_for_path(path)
+        self._span_src = SpanCache.source(path)
+        if saved:
+            self.text_area.mark_set("insert", saved.get("insert", "1.0"))
+            self.text_area.yview("moveto", saved.get("top", 0.0))
+        hit = self._fif_pending.pop(os.path.abspath(path), None)
+        if hit: self._select_fif_hit(*hit)
+        self._set_degraded(self.minified_mode and has_long_line(self.text_area.get("1.0", "end-1c"), MINIFIED_COLS) or None)
+        if self._degraded:
+            self._update_line_numbers()
+            return
+        if self._paint_cached_spans():
+            return
+        if self.lazy_highlight and newlines >= LAZY_MIN_LINES:
+            self._highlight_lazy()
+        else:
+            self._highlight_and_number()
+
+    # span cache: a file reopened unchanged is painted from the result of an earlier pass instead of re-tokenized
+    def _paint_cached_spans(self):
+        if not self._span_src or self._viewer: return False
+        lines = self.text_area.get("1.0", "end-1c").split("\n")
+        res = self.span_cache.load(self._span_src, self.lang_config, len(lines))
+        if res is None: return False
+        res["lines"] = lines
+        self._cancel_lazy()
+        self._hl_rows = self._hl_rows_lines = None
+        self._align_rows(lines)
+        # the visible lines right away, the rest in batches like a background result
+        top, bot = self._visible_rows()
+        self._apply_rows(top, res["rows"][top:bot])
+        self._hl_lines = None
+        self._hl_apply = {"gen": self._hl_gen, "res": res, "k": 0}
+        if not self._poll_job:
+            self._poll_job = self.after(1, self._poll_highlight)
+        self._highlight_job = None
+        self._update_line_numbers()
+        self._update_decorations()
+        return True
+
+    def _cache_spans(self, rows, sync=None, regex=None):
+        # write a finished pass over an unedited file; rows may be a callable building them on the writer thread
+        src, cfg = self._span_src, self._hl_cfg
+        if not src or self._viewer: return
+        sync = bytes(sync) if sync is not None else None
+        regex = list(regex) if sync is None else None
+        def run():
+            self.span_cache.store(src, cfg, rows() if callable(rows) else rows, sync, regex)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _load_language_for_path(self, path):
         cfg = self.config_manager.detect_for_path(path)
         if not cfg:
             ext = os.path.splitext(path)[1].lower()
             if ext == ".py":
-                cfg = {"name":"Python (builtin)", "type":"python", "extensions":[".py"], "keywords":{}}
+                cfg = PYTHON_CONFIG
         
         if cfg:
             self.load_language_config(cfg)
+
+    # chunked open: the widget is filled across after() ticks and highlighting waits for the last chunk
+    def _stream_open(self, path):
+        reader = FileReader(path)
+        self._cancel_lazy()
+        if self._highlight_job:
+            self.after_cancel(self._highlight_job)
+            self._highlight_job = None
+        self._hl_gen += 1
+        self._hl_lines = self._hl_rows = None
+        self.file_path = None
+        ta = self.text_area
+        # no undo history for the load itself; the widget stays read-only until it is complete
+        ta.config(undo=False, state="normal")
+        ta.delete("1.0", tk.END)
+        ta.config(state="disabled")
+        self._stream = {"path": path, "reader": reader, "done": 0, "job": None}
+        self._render_tabs()
+        self._stream_tick()
+
+    def _stream_tick(self):
+        st = self._stream
+        st["job"] = None
+        ta = self.text_area
+        deadline = time.perf_counter() + LAZY_SLICE_MS / 1000.0
+        while time.perf_counter() < deadline:
+            try:
+                item = st["reader"].chunks.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._end_stream()
+                self._finish_load(st["path"], int(ta.index("end-1c").split(".")[0]) - 1)
+                return
+            if isinstance(item, Exception):
+                self._cancel_stream()
+                messagebox.showerror("Error", f"Failed to open file: {item}")
+                return
+            st["done"], txt = item
+            ta.config(state="normal")
+            ta.insert("end-1c", txt)
+            ta.config(state="disabled")
+        pct = st["done"] * 100 // max(1, st["reader"].size)
+        self.title(f"DamEdit — {os.path.basename(st['path'])} (loading {pct}%, Esc to cancel)")
+        st["job"] = self.after(STREAM_POLL_MS, self._stream_tick)
+
+    def _end_stream(self):
+        st = self._stream
+        self._stream = None
+        if st["job"]: self.after_cancel(st["job"])
+        st["reader"].cancel()
+        self.text_area.config(undo=True, state="normal")
+        self.text_area.edit_reset()
+
+    def _cancel_stream(self):
+        # a partly loaded buffer is dropped rather than left around to be saved over the file
+        if not self._stream: return
+        self._fif_pending.pop(os.path.abspath(self._stream["path"]), None)
+        self._end_stream()
+        self.text_area.delete("1.0", tk.END)
+        # neither the chunks nor their removal are edits of the (now empty) buffer
+        self._on_modified()
+        self._doc.dirty = False
+        self._doc.edits = 0
+        self._render_tabs()
+        self.title("DamEdit")
+        self._highlight_and_number()
+
+    # large-file viewer: the widget holds one page of lines cut from the mapped file; the scrollbar, gutter
+    # and find work in file lines through the index, so memory stays bounded whatever the file size
+    def _open_viewer(self, path):
+        index = LineIndex(path)
+        self._cancel_lazy()
+        self.file_path = path
+        self._populate_file_list()
+        self._load_language_for_path(path)
+        self.text_area.config(undo=False, state="normal")
+        self.text_area.delete("1.0", tk.END)
+        self.text_area.config(state="disabled")
+        self._viewer = {"index": index, "base": 0, "end": 0, "paged": False, "job": None, "page_job": None}
+        self._viewer_tick()
+
+    def _viewer_tick(self):
+        v = self._viewer
+        v["job"] = None
+        index = v["index"]
+        name = os.path.basename(index.path)
+        if not v["paged"] and (index.complete or index.count >= VIEWER_PAGE):
+            self._viewer_page(0)
+        elif v["paged"]:
+            self._on_text_yscroll(*self.text_area.yview())
+        if index.complete:
+            self.title(f"DamEdit — {name} (read-only, {index.count:,} lines)")
+            return
+        self.title(f"DamEdit — {name} (read-only, indexing {index.scanned * 100 // max(1, index.size)}%)")
+        v["job"] = self.after(INDEX_POLL_MS, self._viewer_tick)
+
+    def _viewer_page(self, top, col=0):
+        # cut the page around file line top (0-based) and scroll it into view
+        v = self._viewer
+        v["page_job"] = None
+        count = max(1, v["index"].count)
+        top = max(0, min(top, count - 1))
+        base = max(0, min(top - VIEWER_PAGE // 3, count - VIEWER_PAGE))
+        end = min(count, base + VIEWER_PAGE)
+        v.update(base=base, end=end, paged=True)
+        ta = self.text_area
+        ta.config(state="normal")
+        ta.delete("1.0", tk.END)
+        ta.insert("1.0", v["index"].text(base, end))
+        ta.config(state="disabled")
+        ta.mark_set("insert", f"{top - base + 1}.{col}")
+        ta.yview(f"{top - base + 1}.0")
         self._highlight_and_number()
 
+    def _close_viewer(self):
+        v = self._viewer
+        if not v: return
+        self._viewer = None
+        for job in (v["job"], v["page_job"]):
+            if job: self.after_cancel(job)
+        v["index"].close()
+        self.text_area.config(undo=True, state="normal")
+        self.text_area.delete("1.0", tk.END)
+        self.text_area.edit_reset()
+        self.file_path = None
+        self.title("DamEdit")
+
+    def _viewer_scroll(self, first, last):
+        # widget fractions -> file fractions for the scrollbar; a new page is cut near either end of this one
+        v = self._viewer
+        count = max(1, v["index"].count)
+        n = v["end"] - v["base"]
+        top = v["base"] + float(first) * n
+        bottom = v["base"] + float(last) * n
+        self.vscroll.set(top / count, bottom / count)
+        near_top = v["base"] > 0 and top - v["base"] < VIEWER_EDGE
+        near_end = v["end"] < count and v["end"] - bottom < VIEWER_EDGE
+        if (near_top or near_end) and not v["page_job"]:
+            # not from inside the widget's own scroll callback
+            v["page_job"] = self.after_idle(self._viewer_page, int(top))
+
+    def _viewer_find(self, pat, backwards=False):
+        v = self._viewer
+        index = v["index"]
+        ta = self.text_area
+        row, col = map(int, ta.index("insert").split("."))
+        line = v["base"] + row - 1
+        pos = index.starts[line] + len(ta.get(f"{row}.0", "insert").encode("utf-8"))
+        off = index.find(pat, pos, backwards=backwards)
+        if off < 0 and not backwards:
+            off = index.find(pat, 0)
+        if off < 0: return
+        line = index.line_of(off)
+        col = len(index.mm[index.starts[line]:off].decode("utf-8", errors="replace"))
+        if not v["base"] <= line < v["end"]:
+            self._viewer_page(line)
+        idx = f"{line - v['base'] + 1}.{col}"
+        end = f"{idx}+{len(pat)}c"
+        ta.tag_add("search", idx, end)
+        ta.mark_set("insert", idx if backwards else end)
+        ta.see(idx)
+
     def _save_file(self):
+        if self._stream or self._viewer: return
         if not self.file_path:
             self._save_as_file()
             return
-        try:
-            with open(self.file_path, "w", encoding="utf-8") as fh:
-                fh.write(self.text_area.get("1.0", "end-1c"))
-            self._populate_file_list()
-        except Exception as ex:
-            messagebox.showerror("Error", f"Failed to save file: {ex}")
+        self._start_save(self.file_path)
 
     def _save_as_file(self):
+        if self._stream or self._viewer: return
         ext = ".txt"
         if self.lang_config and self.lang_config.get("extensions"):
             ext = self.lang_config["extensions"][0]
         
         p = filedialog.asksaveasfilename(defaultextension=ext)
         if not p: return
+        self._start_save(p, rename=True)
+
+    # saves snapshot the buffer on the Tk thread and write it on a worker thread. saves requested while one is
+    # in flight wait in a queue with one entry per document, so repeated saves of a document coalesce into a
+    # single follow-up save of its newest text
+    def _start_save(self, path, rename=False, doc=None):
+        doc = doc or self._doc
+        if self._save:
+            # a plain save behind a queued Save As is covered by it: both write the newest text
+            if not rename and self._save_queue.get(doc, (None, False))[1]: return
+            self._save_queue[doc] = (path, rename)
+            self.status.config(text=f"Saving {os.path.basename(self._save['path'])}… (another save queued)")
+            return
+        ta = self.text_area if doc is self._doc else doc.state.get("text_area")
+        txt = ta.get("1.0", "end-1c") if ta is not None else doc.text
+        done = queue.Queue()
+        def run():
+            try:
+                atomic_write(path, txt)
+                done.put(None)
+            except Exception as ex:
+                done.put(ex)
+        self._save = {"path": path, "rename": rename, "done": done, "t0": time.perf_counter(),
+                      "doc": doc, "edits": doc.edits}
+        self.status.config(text=f"Saving {os.path.basename(path)}…")
+        threading.Thread(target=run, daemon=True).start()
+        self.after(SAVE_POLL_MS, self._poll_save)
+
+    def _poll_save(self, wait=False):
+        st = self._save
+        if st is None: return
         try:
-            with open(p, "w", encoding="utf-8") as fh:
-                fh.write(self.text_area.get("1.0", "end-1c"))
-            self.file_path = p
-            self.title(f"DamEdit — {os.path.basename(p)}")
+            err = st["done"].get(wait)
+        except queue.Empty:
+            self.after(SAVE_POLL_MS, self._poll_save)
+            return
+        self._save = None
+        ms = (time.perf_counter() - st["t0"]) * 1000
+        if err is not None:
+            self.status.config(text=f"Save failed: {err}")
+            messagebox.showerror("Error", f"Failed to save file: {err}")
+        else:
+            doc = st["doc"]
+            if st["rename"]:
+                if doc is self._doc:
+                    self.file_path = st["path"]
+                    self.title(f"DamEdit — {os.path.basename(st['path'])}")
+                else:
+                    doc.state["file_path"] = st["path"]
+            if doc.edits == st["edits"]: doc.dirty = False
+            self._render_tabs()
+            self.status.config(text=f"Saved {os.path.basename(st['path'])} in {ms:.0f} ms")
             self._populate_file_list()
-        except Exception as ex:
-            messagebox.showerror("Error", f"Failed to save file: {ex}")
+        if self._save_queue:
+            doc = next(iter(self._save_queue))
+            self._start_save(*self._save_queue.pop(doc), doc)
+
+    # tabs: switching parks the active document's state in its Document and swaps the other one's in,
+    # widget, undo stack, tags and highlight bookkeeping included, so nothing is re-read or re-highlighted
+    # session: open files with their cursor, scroll position and language, written on close
+    def _session(self):
+        files, active = [], None
+        for doc in self.docs:
+            if doc is self._doc:
+                path, cfg, viewer = self.file_path, self.lang_config, self._viewer
+                view = (self.text_area.index("insert"), self.text_area.yview()[0])
+            else:
+                path, cfg, viewer, view = doc.path, doc.state.get("lang_config"), doc.state.get("_viewer"), doc.view
+            if not path: continue
+            if doc is self._doc: active = len(files)
+            if viewer: view = ("1.0", 0.0)
+            # a config from the config folder is kept by file name, so a restored tab sees later edits to it
+            lang = cfg and self.config_manager.file_of(cfg) or cfg
+            files.append({"path": os.path.abspath(path), "insert": view[0], "top": view[1], "language": lang})
+        return {"files": files, "active": active}
+
+    def _session_language(self, lang):
+        # a session's language entry as a config: a config folder file name (re-read through the
+        # ConfigManager) or, for one loaded from elsewhere and for older sessions, the config itself
+        if isinstance(lang, str): return self.config_manager.load_file(lang)
+        return lang if isinstance(lang, dict) else None
+
+    def _save_session(self):
+        try:
+            os.makedirs(os.path.dirname(self.session_file), exist_ok=True)
+            atomic_write(self.session_file, json.dumps(self._session(), indent=1, default=sorted))
+        except OSError as ex:
+            print(f"[session] not saved: {ex}")
+
+    def _restore_session(self):
+        try:
+            with open(self.session_file, "r", encoding="utf-8") as fh:
+                sess = json.load(fh)
+            files = [e for e in sess["files"] if isinstance(e.get("path"), str)]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return
+        finally:
+            self._restored = True
+        entries = [(k, e) for k, e in enumerate(files) if os.path.isfile(e["path"])]
+        if not entries: return
+        active = next((e for k, e in entries if k == sess.get("active")), entries[-1][1])
+        for k, entry in entries:
+            self._session_pending[os.path.abspath(entry["path"])] = entry
+        # only the active file is read now; the others get tabs without a widget, filled when first shown
+        self._load_path(active["path"])
+        shown, docs = self._doc, []
+        for k, entry in entries:
+            if entry is active:
+                docs.append(shown)
+                continue
+            doc = Document({"file_path": entry["path"], "lang_config": self._session_language(entry.get("language"))})
+            doc.view = (entry.get("insert", "1.0"), entry.get("top", 0.0))
+            docs.append(doc)
+        self.docs = docs + [d for d in self.docs if d is not shown]
+        self._render_tabs()
+
+    def _on_close(self):
+        # the save thread is a daemon: wait for a write in flight (and any save queued behind it) before exiting
+        while self._save: self._poll_save(wait=True)
+        if self._restored: self._save_session()
+        self.destroy()
+
+    def _path_of(self, doc):
+        # the active document's state dict is only brought up to date when it is parked; a document that is
+        # still loading goes by the file being read
+        path, stream = (self.file_path, self._stream) if doc is self._doc else (doc.path, doc.state.get("_stream"))
+        return path or (stream["path"] if stream else None)
+
+    def _new_tab(self):
+        ta = self._new_text()
+        ta.grid_remove()
+        doc = Document(dict.fromkeys(DOC_STATE))
+        doc.state["text_area"] = ta
+        self.docs.insert(self.docs.index(self._doc) + 1, doc)
+        self._switch_to(doc)
+        self.load_language_config(PYTHON_CONFIG)
+        return doc
+
+    def _park_doc(self):
+        doc = self._doc
+        ta = self.text_area
+        if self._highlight_job:
+            self.after_cancel(self._highlight_job)
+            self._highlight_job = None
+            doc.stale = True
+        if self._lazy:
+            self._cancel_lazy()
+            doc.stale = True
+        if self._hl_pending is not None or self._hl_apply is not None:
+            # a background pass was in flight; whatever it had applied is unknown
+            self._hl_lines = self._hl_rows = None
+            doc.stale = True
+        if self._viewer:
+            for job in ("job", "page_job"):
+                if self._viewer[job]: self.after_cancel(self._viewer[job])
+                self._viewer[job] = None
+        if self._stream and self._stream["job"]:
+            # the reader stops once its bounded queue is full; the load resumes when the tab is shown again
+            self.after_cancel(self._stream["job"])
+            self._stream["job"] = None
+        doc.view = (ta.index("insert"), ta.yview()[0])
+        doc.size = (ta.count("1.0", "end", "chars") or (0,))[0]
+        doc.state = {k: getattr(self, k) for k in DOC_STATE}
+        ta.grid_remove()
+
+    def _switch_to(self, doc):
+        if doc is self._doc: return
+        self._park_doc()
+        self._hl_gen += 1
+        self._hl_pending = self._hl_apply = None
+        self._doc = doc
+        self._doc_clock += 1
+        doc.used = self._doc_clock
+        if doc.live:
+            for k, v in doc.state.items(): setattr(self, k, v)
+        else:
+            self._restore_doc(doc)
+        ta = self.text_area
+        ta.grid(row=2, column=4, sticky="nsew")
+        self._apply_text_colors()
+        self.ensure_tags(self.theme.keys())
+        ta.mark_set("insert", doc.view[0])
+        ta.yview("moveto", doc.view[1])
+        ta.focus_set()
+        self.title(f"DamEdit — {os.path.basename(self.file_path)}" if self.file_path else "DamEdit")
+        self._render_tabs()
+        if self._viewer and not self._viewer["index"].complete:
+            self._viewer_tick()
+        if self._stream:
+            # a parked load picks up where it stopped (a re-read after eviction is already ticking)
+            if not self._stream["job"]: self._stream_tick()
+        elif doc.stale:
+            doc.stale = False
+            self._highlight_and_number()
+        self._ln_drawn = None
+        self._update_line_numbers()
+        self._update_decorations()
+        self._show_mode()
+        if self.search_win: self._schedule_find()
+        self._enforce_tab_budget()
+
+    def _enforce_tab_budget(self):
+        # least recently used inactive tabs give up their widgets until the rest fit the budget
+        live = sorted((d for d in self.docs if d.live and d is not self._doc), key=lambda d: d.used)
+        total = sum(d.size for d in live)
+        for d in live:
+            if total <= self.tab_memory_budget: break
+            self._evict_doc(d)
+            total -= d.size
+
+    def _evict_doc(self, doc):
+        st = doc.state
+        ta = st["text_area"]
+        if doc.dirty: doc.text = ta.get("1.0", "end-1c")
+        if st["_viewer"]: st["_viewer"]["index"].close()
+        path = st["file_path"]
+        if st["_stream"]:
+            # a half-loaded buffer is read again from the start when the tab comes back
+            st["_stream"]["reader"].cancel()
+            path = st["_stream"]["path"]
+        ta.destroy()
+        doc.state = {"file_path": path, "lang_config": st["lang_config"]}
+
+    def _restore_doc(self, doc):
+        # a fresh widget, filled from the unsaved text kept at eviction or read again from disk
+        st = doc.state
+        for k in DOC_STATE: setattr(self, k, None)
+        self.text_area = self._new_text()
+        self.text_area.grid_remove()
+        self.load_language_config(st.get("lang_config") or PYTHON_CONFIG)
+        if doc.text is not None:
+            self.file_path = st.get("file_path")
+            self.text_area.insert("1.0", doc.text)
+            self.text_area.edit_reset()
+            doc.text = None
+            doc.stale = True
+        elif st.get("file_path"):
+            self._read_into_doc(st["file_path"])
+
+    def _close_tab(self, doc):
+        if doc.dirty and not messagebox.askokcancel("Unsaved changes", f"Close {os.path.basename(self._path_of(doc) or 'untitled')} without saving?"):
+            return
+        if doc is self._doc:
+            if len(self.docs) == 1: self._new_tab()
+            else:
+                k = self.docs.index(doc)
+                self._switch_to(self.docs[k + 1] if k + 1 < len(self.docs) else self.docs[k - 1])
+        self.docs.remove(doc)
+        self._save_queue.pop(doc, None)
+        if doc.live:
+            if doc.state["_viewer"]: doc.state["_viewer"]["index"].close()
+            if doc.state["_stream"]: doc.state["_stream"]["reader"].cancel()
+            doc.state["text_area"].destroy()
+        self._render_tabs()
+
+    def _render_tabs(self):
+        for w in self.tabbar.winfo_children(): w.destroy()
+        for doc in self.docs:
+            path = self._path_of(doc)
+            name = os.path.basename(path) if path else "untitled"
+            if doc.dirty: name = "• " + name
+            tab = ttk.Frame(self.tabbar, style="ToolBar.TFrame")
+            tab.pack(side="left", padx=(4,0))
+            style = "ActiveTab.TButton" if doc is self._doc else "Round.TButton"
+            ttk.Button(tab, text=name, style=style, command=lambda d=doc: self._switch_to(d)).pack(side="left")
+            ttk.Button(tab, text="✕", width=2, style=style, command=lambda d=doc: self._close_tab(d)).pack(side="left")
 
     # menus to load theme/language
     def _menu_load_language(self):
@@ -648,58 +2915,356 @@ class ConfigEditor(tk.Tk):
         if self.search_win:
             self.search_win.lift(); return
         self.search_win = tk.Toplevel(self)
-        self.search_win.title("Find"); self.search_win.transient(self); self.search_win.resizable(False, False); self.search_win.iconbitmap("assets\\DamEdit.ico")
+        self.search_win.title("Find"); self.search_win.transient(self); self.search_win.resizable(False, False); self._set_icon(self.search_win)
         self.search_win.protocol("WM_DELETE_WINDOW", self._close_find)
         frame = ttk.Frame(self.search_win, style="SideBar.TFrame")
         frame.pack(fill="both", expand=True, padx=6, pady=6)
         ttk.Label(frame, text="🔍 Find:", background=self.theme.get("ln_bg"), foreground=self.theme.get("editor_fg")).grid(row=0, column=0, sticky="w", padx=4, pady=4)
         self.find_entry = ttk.Entry(frame, width=30, style="Dark.TEntry")
         self.find_entry.grid(row=0, column=1, sticky="ew", padx=4, pady=4)
+        self.find_status = ttk.Label(frame, text="", width=14, background=self.theme.get("ln_bg"), foreground=self.theme.get("ln_fg"))
+        self.find_status.grid(row=0, column=2, sticky="e", padx=4, pady=4)
         frame.columnconfigure(1, weight=1)
         self.find_entry.focus()
         self.find_entry.bind("<Return>", lambda e: self._find_next())
         self.find_entry.bind("<Shift-Return>", lambda e: self._find_prev())
         self.find_entry.bind("<Escape>", lambda e: self._close_find())
+        self.find_entry.bind("<KeyRelease>", lambda e: e.keysym not in ("Return", "Escape") and self._schedule_find())
+        ttk.Label(frame, text="↪ Replace:", background=self.theme.get("ln_bg"), foreground=self.theme.get("editor_fg")).grid(row=1, column=0, sticky="w", padx=4, pady=4)
+        self.replace_entry = ttk.Entry(frame, width=30, style="Dark.TEntry")
+        self.replace_entry.grid(row=1, column=1, sticky="ew", padx=4, pady=4)
+        self.replace_entry.bind("<Return>", lambda e: self._replace_one())
+        self.replace_entry.bind("<Escape>", lambda e: self._close_find())
+        self.find_regex = tk.BooleanVar(self, value=False)
+        self.find_case = tk.BooleanVar(self, value=False)
+        opts = ttk.Frame(frame, style="SideBar.TFrame")
+        opts.grid(row=2, column=0, columnspan=3, pady=(4,0))
+        ttk.Checkbutton(opts, text="Regex", variable=self.find_regex, command=self._schedule_find).pack(side="left", padx=2)
+        ttk.Checkbutton(opts, text="Match case", variable=self.find_case, command=self._schedule_find).pack(side="left", padx=2)
         btns = ttk.Frame(frame, style="SideBar.TFrame")
-        btns.grid(row=1, column=0, columnspan=2, pady=(4,0))
+        btns.grid(row=3, column=0, columnspan=3, pady=(4,0))
         ttk.Button(btns, text="◀ Prev", style="Round.TButton", command=self._find_prev).pack(side="left", padx=2)
         ttk.Button(btns, text="Next ▶", style="Round.TButton", command=self._find_next).pack(side="left", padx=2)
+        ttk.Button(btns, text="Replace", style="Round.TButton", command=self._replace_one).pack(side="left", padx=2)
+        ttk.Button(btns, text="Replace All", style="Round.TButton", command=self._replace_all).pack(side="left", padx=2)
         ttk.Button(btns, text="✖ Close", style="Round.TButton", command=self._close_find).pack(side="left", padx=2)
 
     def _close_find(self):
         if not self.search_win: return
+        if self._find_job: self.after_cancel(self._find_job)
+        self._find = self._find_job = None
         self.text_area.tag_remove("search", "1.0", tk.END)
+        self.text_area.tag_remove("search_hit", "1.0", tk.END)
         self.search_win.destroy(); self.search_win = None
 
-    def _find_next(self):
+    # find engine: one scan per query into a FindIndex; next/prev are bisects into it and edits
+    # update it through the changed lines only
+    def _find_index(self):
         pat = self.find_entry.get()
-        if not pat: return
+        if not pat: return None
+        query = (pat, self.find_regex.get(), self.find_case.get())
+        if not self._find or self._find.query != query:
+            self._find_cur = None
+            try:
+                self._find = FindIndex(*query)
+            except re.error as ex:
+                self._find = None
+                self.find_status.config(text="bad regex")
+                return None
+        if self._find.gen != self._hl_gen:
+            # the generation also moves for things that leave the text alone (a language switch, a tab
+            # switch); the selected match only goes when the text really changed
+            old = self._find.lines
+            self._find.update(self.text_area.get("1.0", "end-1c"))
+            self._find.gen = self._hl_gen
+            if old is None or changed_line_range(old, self._find.lines)[0] < max(len(old), len(self._find.lines)):
+                self._find_cur = None
+        return self._find
+
+    def _schedule_find(self):
+        if self._find_job: self.after_cancel(self._find_job)
+        self._find_job = self.after(150, self._refresh_find)
+
+    def _refresh_find(self):
+        self._find_job = None
+        if not self.search_win or self._viewer: return
         self.text_area.tag_remove("search", "1.0", tk.END)
-        start = self.text_area.index("insert +1c")
-        idx = self.text_area.search(pat, start, tk.END, nocase=True)
-        if not idx:
-            idx = self.text_area.search(pat, "1.0", start, nocase=True)
-        if idx:
-            end = f"{idx}+{len(pat)}c"
-            self.text_area.tag_add("search", idx, end)
-            self.text_area.mark_set("insert", end)
-            self.text_area.see(idx)
+        idx = self._find_index()
+        if idx is None:
+            self.text_area.tag_remove("search_hit", "1.0", tk.END)
+            if not self.find_entry.get(): self.find_status.config(text="")
+            return
+        self.find_status.config(text=f"{len(idx)} matches" if len(idx) != 1 else "1 match")
+        self._paint_find_hits()
+
+    def _paint_find_hits(self):
+        # tag the matches on screen only; scrolling repaints
+        idx = self._find
+        ta = self.text_area
+        ta.tag_remove("search_hit", "1.0", tk.END)
+        top, bot = self._visible_rows()
+        lo = idx.offset(top + 1, 0)
+        hi = idx.offs[bot] if bot < len(idx.offs) else idx.offs[-1] + len(idx.lines[-1])
+        k = bisect.bisect_left(idx.ends, lo)
+        ranges = []
+        while k < len(idx) and idx.starts[k] < hi and len(ranges) < 2 * FIND_PAINT_MAX:
+            ranges += [idx.index(idx.starts[k]), idx.index(idx.ends[k])]
+            k += 1
+        if ranges: ta.tag_add("search_hit", *ranges)
+
+    def _find_step(self, backwards=False):
+        ta = self.text_area
+        ta.tag_remove("search", "1.0", tk.END)
+        idx = self._find_index()
+        if idx is None: return
+        if not len(idx):
+            self.find_status.config(text="no matches")
+            ta.tag_remove("search_hit", "1.0", tk.END)
+            return
+        line, col = map(int, ta.index("insert").split("."))
+        pos = idx.offset(line, col)
+        k = idx.prev(pos) if backwards else idx.next(pos)
+        # the cursor sits on the selected match (start after Prev, end after Next); step past it
+        if not backwards and idx.starts[k] == self._find_cur == pos:
+            k = (k + 1) % len(idx)
+        elif backwards and idx.starts[k] == self._find_cur and idx.ends[k] == pos:
+            k = (k - 1) % len(idx)
+        self._find_cur = idx.starts[k]
+        start, end = idx.index(idx.starts[k]), idx.index(idx.ends[k])
+        ta.tag_add("search", start, end)
+        ta.mark_set("insert", start if backwards else end)
+        ta.see(start)
+        self.find_status.config(text=f"{k + 1} of {len(idx)}")
+        self._paint_find_hits()
+
+    def _find_next(self):
+        if self._viewer:
+            pat = self.find_entry.get()
+            if not pat: return
+            self.text_area.tag_remove("search", "1.0", tk.END)
+            self._viewer_find(pat)
+            return
+        self._find_step()
 
     def _find_prev(self):
-        pat = self.find_entry.get()
+        if self._viewer:
+            pat = self.find_entry.get()
+            if not pat: return
+            self.text_area.tag_remove("search", "1.0", tk.END)
+            self._viewer_find(pat, backwards=True)
+            return
+        self._find_step(backwards=True)
+
+    # replace: the text of each match is computed from a snapshot and written back as one widget edit
+    def _replacement(self, idx, txt, k, repl):
+        # literal replacement text, or the regex template expanded for match k (\1, \g<name>).
+        # raises ValueError when the query no longer matches exactly that span of txt
+        m = idx.cre.match(txt, idx.starts[k])
+        if not m or m.end() != idx.ends[k]:
+            raise ValueError("match changed")
+        return m.expand(repl) if idx.query[1] else repl
+
+    def _replace_range(self, start, end, text):
+        # a single undo step and a single re-highlight, however much changed
+        ta = self.text_area
+        auto = ta.cget("autoseparators")
+        ta.config(autoseparators=False)
+        ta.edit_separator()
+        ta.replace(start, end, text)
+        ta.edit_separator()
+        ta.config(autoseparators=auto)
+        self._on_modified()
+        self._schedule_highlight()
+
+    def _replace_one(self):
+        if self._viewer: return
+        idx = self._find_index()
+        if idx is None: return
+        k = bisect.bisect_left(idx.starts, self._find_cur) if self._find_cur is not None else len(idx)
+        if k >= len(idx) or idx.starts[k] != self._find_cur:
+            # nothing selected yet: the first press selects the next match
+            self._find_step()
+            return
+        txt = self.text_area.get("1.0", "end-1c")
+        try:
+            new = self._replacement(idx, txt, k, self.replace_entry.get())
+        except (re.error, IndexError):
+            self.find_status.config(text="bad replacement")
+            return
+        except ValueError:
+            self._find_cur = None
+            self.find_status.config(text="match changed")
+            return
+        start = idx.index(idx.starts[k])
+        self._replace_range(start, idx.index(idx.ends[k]), new)
+        self.text_area.mark_set("insert", f"{start}+{len(new)}c")
+        self._find_step()
+
+    def _replace_all(self):
+        if self._viewer: return
+        idx = self._find_index()
+        if idx is None: return
+        if not len(idx):
+            self.find_status.config(text="no matches")
+            return
+        txt = self.text_area.get("1.0", "end-1c")
+        # the matches are taken from this snapshot, not from the index, so the edit always fits the text it replaces
+        found = list(idx.cre.finditer(txt))
+        ms = [m for m in found if m.end() > m.start()]
+        if not ms:
+            self.find_status.config(text="no matches")
+            return
+        a, b = ms[0].start(), ms[-1].end()
+        repl = self.replace_entry.get()
+        try:
+            new = None
+            if idx.query[1] and len(found) == len(ms):
+                # re.subn parses the template once. it walks the same matches as finditer, so with no empty
+                # matches to skip its spans are exactly ms
+                out, n = idx.cre.subn(repl, txt)
+                if n == len(ms): new = out[a:len(out) - (len(txt) - b)]
+            if new is None:
+                parts = []
+                pos = a
+                for m in ms:
+                    parts.append(txt[pos:m.start()])
+                    parts.append(m.expand(repl) if idx.query[1] else repl)
+                    pos = m.end()
+                new = "".join(parts)
+        except (re.error, IndexError):
+            self.find_status.config(text="bad replacement")
+            return
+        n = len(ms)
+        offs = line_offsets(txt.split("\n"))
+        insert = self.text_area.index("insert")
+        self._replace_range("%d.%d" % offset_rc(offs, a), "%d.%d" % offset_rc(offs, b), new)
+        self.text_area.mark_set("insert", insert)
+        self.text_area.tag_remove("search", "1.0", tk.END)
+        self._find_cur = None
+        if self._find_job: self.after_cancel(self._find_job)
+        self._refresh_find()
+        self.find_status.config(text=f"replaced {n}")
+
+    # find in files: results stream into the panel while the pool searches the tree under the working directory
+    def _open_find_in_files(self):
+        if self.fif_win:
+            self.fif_win.lift(); return
+        self.fif_win = tk.Toplevel(self)
+        self.fif_win.title("Find in Files"); self.fif_win.transient(self); self.fif_win.geometry("640x420"); self._set_icon(self.fif_win)
+        self.fif_win.protocol("WM_DELETE_WINDOW", self._close_find_in_files)
+        frame = ttk.Frame(self.fif_win, style="SideBar.TFrame")
+        frame.pack(fill="both", expand=True, padx=6, pady=6)
+        ttk.Label(frame, text="🗃 Find:", background=self.theme.get("ln_bg"), foreground=self.theme.get("editor_fg")).grid(row=0, column=0, sticky="w", padx=4, pady=4)
+        self.fif_entry = ttk.Entry(frame, width=30, style="Dark.TEntry")
+        self.fif_entry.grid(row=0, column=1, sticky="ew", padx=4, pady=4)
+        self.fif_entry.focus()
+        self.fif_entry.bind("<Return>", lambda e: self._start_find_in_files())
+        self.fif_entry.bind("<Escape>", lambda e: self._close_find_in_files())
+        self.fif_regex = tk.BooleanVar(self, value=False)
+        self.fif_case = tk.BooleanVar(self, value=False)
+        btns = ttk.Frame(frame, style="SideBar.TFrame")
+        btns.grid(row=1, column=0, columnspan=2, sticky="w", pady=(4,0))
+        ttk.Checkbutton(btns, text="Regex", variable=self.fif_regex).pack(side="left", padx=2)
+        ttk.Checkbutton(btns, text="Match case", variable=self.fif_case).pack(side="left", padx=2)
+        ttk.Button(btns, text="Search", style="Round.TButton", command=self._start_find_in_files).pack(side="left", padx=2)
+        ttk.Button(btns, text="■ Stop", style="Round.TButton", command=self._stop_find_in_files).pack(side="left", padx=2)
+        self.fif_status = ttk.Label(frame, text="", background=self.theme.get("ln_bg"), foreground=self.theme.get("ln_fg"))
+        self.fif_status.grid(row=2, column=0, columnspan=2, sticky="w", padx=4, pady=4)
+        self.fif_list = tk.Listbox(frame, bg=self.theme.get("ln_bg"), fg=self.theme.get("editor_fg"), selectbackground=self.theme.get("accent"), selectforeground=self.theme.get("editor_bg"), font=("Consolas",10), bd=0, highlightthickness=0)
+        self.fif_list.grid(row=3, column=0, columnspan=2, sticky="nsew", padx=4, pady=4)
+        self.fif_list.bind("<Double-1>", self._open_fif_hit)
+        self.fif_list.bind("<Return>", self._open_fif_hit)
+        frame.columnconfigure(1, weight=1)
+        frame.rowconfigure(3, weight=1)
+        self._fif_hits = []
+
+    def _close_find_in_files(self):
+        if not self.fif_win: return
+        self._stop_find_in_files()
+        self.fif_win.destroy(); self.fif_win = None
+
+    def _start_find_in_files(self):
+        pat = self.fif_entry.get()
         if not pat: return
+        self._stop_find_in_files()
+        try:
+            cre = re.compile(pat if self.fif_regex.get() else re.escape(pat), 0 if self.fif_case.get() else re.IGNORECASE)
+        except re.error as ex:
+            self.fif_status.config(text=f"bad regex: {ex}")
+            return
+        self.fif_list.delete(0, tk.END)
+        self._fif_hits = []
+        self._fif_count = [0, 0]    # hits, files with hits
+        self._fif = FileSearch(os.getcwd(), cre)
+        self._fif_job = self.after(FIF_POLL_MS, self._poll_find_in_files)
+
+    def _stop_find_in_files(self):
+        if self._fif_job: self.after_cancel(self._fif_job)
+        self._fif_job = None
+        if self._fif:
+            self._fif.cancel()
+            self._fif_report(stopped=True)
+        self._fif = None
+
+    def _fif_report(self, done=False, stopped=False):
+        fs = self._fif
+        secs = max(1e-6, time.perf_counter() - fs.started)
+        state = " (done)" if done else " (stopped)" if stopped else "…"
+        self.fif_status.config(text=f"{self._fif_count[0]} hits in {self._fif_count[1]} files · {fs.files} files searched, {fs.files / secs:.0f} files/s{state}")
+
+    def _poll_find_in_files(self):
+        fs = self._fif
+        self._fif_job = None
+        rows = []
+        done = False
+        while True:
+            try:
+                item = fs.results.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                done = True
+                break
+            path, hits = item
+            self._fif_count[0] += len(hits)
+            self._fif_count[1] += 1
+            for line, col, n, text in hits:
+                if len(self._fif_hits) >= FIF_MAX_HITS: break
+                self._fif_hits.append((path, line, col, n))
+                rows.append(f"{path}:{line}: {text}")
+        if rows: self.fif_list.insert(tk.END, *rows)
+        self._fif_report(done=done)
+        if done:
+            self._fif = None
+            return
+        self._fif_job = self.after(FIF_POLL_MS, self._poll_find_in_files)
+
+    def _open_fif_hit(self, event=None):
+        sel = self.fif_list.curselection()
+        if not sel or sel[0] >= len(self._fif_hits): return
+        path, line, col, n = self._fif_hits[sel[0]]
+        self._load_path(path)
+        if self._stream:
+            # a big file is still streaming in; _finish_load selects the hit
+            self._fif_pending[os.path.abspath(path)] = (line, col, n)
+            return
+        if self._viewer: return
+        self._select_fif_hit(line, col, n)
+
+    def _select_fif_hit(self, line, col, n):
+        idx = f"{line}.{col}"
         self.text_area.tag_remove("search", "1.0", tk.END)
-        curr = self.text_area.index("insert")
-        idx = self.text_area.search(pat, "1.0", curr, backwards=True, nocase=True)
-        if idx:
-            end = f"{idx}+{len(pat)}c"
-            self.text_area.tag_add("search", idx, end)
-            self.text_area.mark_set("insert", idx)
-            self.text_area.see(idx)
+        self.text_area.tag_add("search", idx, f"{idx}+{n}c")
+        self.text_area.mark_set("insert", idx)
+        self.text_area.see(idx)
+        self._update_decorations()
 
     # scrolling & font
     def _on_vscroll(self, *args):
-        self.text_area.yview(*args); self.linenumbers.yview(*args)
+        if self._viewer and args[0] == "moveto":
+            self._viewer_page(int(float(args[1]) * self._viewer["index"].count))
+            return
+        self.text_area.yview(*args)
 
     def _on_mousewheel(self, event):
         if hasattr(event, "delta"):
@@ -707,31 +3272,122 @@ class ConfigEditor(tk.Tk):
         else:
             delta = 1 if event.num == 5 else -1
         self.text_area.yview_scroll(delta, "units")
-        self.linenumbers.yview_scroll(delta, "units")
         return "break"
 
     def _increase_font(self):
         size = max(6, self._font['size'] + 2); self._font.config(size=size)
-        self.text_area.config(font=self._font); self.linenumbers.config(font=(self._font.actual('family'), self._font.actual('size')))
+        self.text_area.config(font=self._font); self._update_line_numbers()
 
     def _decrease_font(self):
         size = max(6, self._font['size'] - 2); self._font.config(size=size)
-        self.text_area.config(font=self._font); self.linenumbers.config(font=(self._font.actual('family'), self._font.actual('size')))
+        self.text_area.config(font=self._font); self._update_line_numbers()
 
     # shortcuts
     def _bind_shortcuts(self):
         self.bind_all("<Control-o>", lambda e: self._open_file())
         self.bind_all("<Control-s>", lambda e: self._save_file())
         self.bind_all("<Control-f>", lambda e: self._open_find())
+        self.bind_all("<Control-F>", lambda e: self._open_find_in_files())
         self.bind_all("<Control-plus>", lambda e: self._increase_font())
         self.bind_all("<Control-equal>", lambda e: self._increase_font())
         self.bind_all("<Control-minus>", lambda e: self._decrease_font())
+        self.bind("<Escape>", lambda e: self._cancel_stream())
+        self.bind_all("<Control-n>", lambda e: self._new_tab())
+        self.bind_all("<Control-w>", lambda e: self._close_tab(self._doc))
+        self.bind_all("<Control-Tab>", lambda e: (self._switch_to(self.docs[(self.docs.index(self._doc) + 1) % len(self.docs)]), "break")[1])
+
+# batch highlighting from the command line: python main.py highlight SRC -o OUT [--format html|json] [--jobs N]
+_cli = {}   # per worker process: the ConfigManager and a LanguageCache shared by its jobs
+
+def _cli_init(config_dir):
+    _cli["configs"] = ConfigManager(config_dir, STATE_DIR)
+    _cli["cache"] = LanguageCache()
+
+def _cli_language(path):
+    cfg = _cli["configs"].detect_for_path(path)
+    if not cfg and os.path.splitext(path)[1].lower() == ".py": cfg = PYTHON_CONFIG
+    return cfg
+
+def render_html(txt, spans, theme=DEFAULT_THEME, title=""):
+    # spans may nest (an f-string prefix inside its string); a character takes the tag of the latest starting one,
+    # and of the shorter (inner) one when two start together
+    import html
+    starts = {}
+    for tag, s, e in spans:
+        if e > s: starts.setdefault(s, []).append((s, e, tag))
+    cuts = sorted({0, len(txt)}.union(*([sp[0], sp[1]] for group in starts.values() for sp in group)))
+    out, active = [], []
+    for a, b in zip(cuts, cuts[1:]):
+        active = [sp for sp in active if sp[1] > a] + starts.get(a, [])
+        piece = html.escape(txt[a:b])
+        if active:
+            piece = f'<span class="{max(active, key=lambda sp: (sp[0], -sp[1]))[2]}">{piece}</span>'
+        out.append(piece)
+    css = "".join(f".{tag}{{color:{theme[tag]}}}" for tag in sorted({sp[0] for sp in spans}) if tag in theme)
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title><style>"
+            f"body{{background:{theme['editor_bg']};color:{theme['editor_fg']}}}{css}</style></head>"
+            f"<body><pre>{''.join(out)}</pre></body></html>\n")
+
+def _cli_job(path, rel, out, fmt):
+    # runs in a worker process; returns (rel, span count or None, error)
+    cfg = _cli_language(path)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            txt = fh.read()
+        spans = sorted(_cli["cache"].get(cfg, Highlighter).spans(txt), key=lambda sp: (sp[1], sp[2], sp[0]))
+        target = os.path.join(out, rel + "." + fmt)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "w", encoding="utf-8") as fh:
+            if fmt == "json":
+                json.dump({"path": rel, "language": cfg.get("name"), "spans": spans}, fh)
+            else:
+                theme = dict(DEFAULT_THEME, **(cfg.get("theme") or cfg.get("colors") or {}))
+                fh.write(render_html(txt, spans, theme, rel))
+    except (OSError, UnicodeDecodeError) as ex:
+        return rel, None, str(ex)
+    return rel, len(spans), None
+
+def highlight_cli(argv):
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    ap = argparse.ArgumentParser(prog="main.py highlight", description="Highlight files without the GUI.")
+    ap.add_argument("src", help="file or directory; directories are walked honoring .gitignore")
+    ap.add_argument("-o", "--out", default="highlighted", help="output directory (default: %(default)s)")
+    ap.add_argument("--format", choices=("html", "json"), default="html")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes (default: %(default)s)")
+    ap.add_argument("--configs", default=CONFIG_DIR, help="language config folder (default: %(default)s)")
+    args = ap.parse_args(argv)
+    if os.path.isdir(args.src):
+        files = [(os.path.join(args.src, rel), rel) for rel in walk_files(args.src)]
+    else:
+        files = [(args.src, os.path.basename(args.src))]
+    # only files with a language go to the pool
+    _cli_init(args.configs)
+    files = [(path, rel) for path, rel in files if _cli_language(path)]
+    t0 = time.perf_counter()
+    n = total = failed = 0
+    jobs = max(1, min(args.jobs, len(files)))
+    with ProcessPoolExecutor(jobs, initializer=_cli_init, initargs=(args.configs,)) as pool:
+        for rel, count, err in pool.map(_cli_job, [f[0] for f in files], [f[1] for f in files], [args.out]*len(files),
+                                        [args.format]*len(files), chunksize=max(1, len(files) // (jobs * 8))):
+            if err is None:
+                n += 1; total += count
+            else:
+                failed += 1
+                print(f"{rel}: {err}", file=sys.stderr)
+    print(f"{n} files, {total} spans in {time.perf_counter() - t0:.2f} s -> {args.out}" + (f" ({failed} failed)" if failed else ""))
+    return 1 if failed else 0
 
 # run
-def main():
-    app = ConfigEditor()
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["highlight"]:
+        return highlight_cli(argv[1:])
+    report = "check" if "--startup-check" in argv else "print" if "--startup-report" in argv else None
+    app = ConfigEditor(report)
     app.mainloop()
+    if app.startup_ok is False: return 1
 
 if __name__ == "__main__":
 
-    main()
+    sys.exit(main())
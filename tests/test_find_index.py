@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from main import FindIndex
+
+QUERIES = [
+    ("a", False, False),
+    ("ab", False, True),
+    ("aa", False, False),
+    ("b\n", False, False),
+    (r"\w+\s+\w+", True, False),
+    (r"b\n+a", True, False),
+    (r"a+", True, True),
+    (r"^b", True, False),
+]
+PIECES = ["", "a", "b", "A", "ab", "aa", " ", "\n", "\n\n", "ba\n", " a b "]
+
+
+def full_scan(query, txt):
+    idx = FindIndex(*query)
+    idx.update(txt)
+    return idx
+
+
+class FindIndexUpdateTest(unittest.TestCase):
+    # update() after an edit must give what a fresh scan of the new text gives
+
+    def check(self, query, before, after):
+        idx = FindIndex(*query)
+        idx.update(before)
+        idx.update(after)
+        ref = full_scan(query, after)
+        msg = f"{query!r}: {before!r} -> {after!r}"
+        self.assertEqual((idx.starts, idx.ends), (ref.starts, ref.ends), msg)
+        self.assertEqual(idx.offs, ref.offs, msg)
+
+    def test_reported_cases(self):
+        self.check((r"\w+\s+\w+", True, False), "b\n\n", "b\n\na")
+        self.check((r"\w+\s+\w+", True, False), "ba\n\nb\nb\n a", " \n\nb\nb\n a")
+
+    def test_random_edits(self):
+        rnd = random.Random(12)
+        for query in QUERIES:
+            for _ in range(300):
+                txt = "".join(rnd.choice(PIECES) for _ in range(rnd.randrange(12)))
+                i = rnd.randrange(len(txt) + 1)
+                j = min(len(txt), i + rnd.choice([0, 0, 1, 2, 5]))
+                self.check(query, txt, txt[:i] + rnd.choice(PIECES) + txt[j:])
+
+    def test_edit_sequence(self):
+        rnd = random.Random(7)
+        for query in QUERIES:
+            idx = FindIndex(*query)
+            txt = "ab a\nba\n\naa b\n" * 3
+            idx.update(txt)
+            for _ in range(200):
+                i = rnd.randrange(len(txt) + 1)
+                j = min(len(txt), i + rnd.choice([0, 1, 3]))
+                txt = txt[:i] + rnd.choice(PIECES) + txt[j:]
+                idx.update(txt)
+                ref = full_scan(query, txt)
+                self.assertEqual((idx.starts, idx.ends), (ref.starts, ref.ends), f"{query!r}: {txt!r}")
+
+
+if __name__ == "__main__":
+    unittest.main()